@@ -0,0 +1,41 @@
+import os
+import time
+from urllib.parse import urlsplit
+from zipfile import ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+# Formats that are already compressed; deflating them again only burns CPU
+COMPRESSED_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/webp"}
+COMPRESSED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def image_extension(img_url, content_type=""):
+    """Extension for an image, from the URL path or else the Content-Type."""
+    ext = os.path.splitext(urlsplit(img_url).path)[1].lower()
+    if ext:
+        return ext
+    if content_type.startswith("image/"):
+        return "." + content_type.split("/")[1].split(";")[0].strip()
+    return ".jpg"
+
+
+def entry_name(index, img_url, content_type=""):
+    """Name of the index-th image inside the archive, e.g. image_3.png."""
+    return f"image_{index}{image_extension(img_url, content_type)}"
+
+
+def compress_type_for(name, content_type="", deflate_everything=False):
+    """ZIP_STORED for JPEG/PNG/WebP, ZIP_DEFLATED for everything else."""
+    if deflate_everything:
+        return ZIP_DEFLATED
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in COMPRESSED_TYPES or os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+def entry_info(name, content_type="", deflate_everything=False):
+    """ZipInfo for a new entry with the right compression method."""
+    zinfo = ZipInfo(name, date_time=time.localtime()[:6])
+    zinfo.compress_type = compress_type_for(name, content_type, deflate_everything)
+    zinfo.external_attr = 0o644 << 16  # Regular file, rw-r--r--
+    return zinfo
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import aiohttp
+
+from filename_utils import sanitize_filename
+from http_session import USER_AGENT
+
+# Default limits for the async engine
+DEFAULT_MAX_CONCURRENCY = 1000  # Transfers in flight across all hosts
+DEFAULT_PER_HOST_LIMIT = 20  # Transfers in flight against a single host
+DEFAULT_DNS_TTL = 300  # Seconds a resolved address is reused
+CHUNK_SIZE = 64 * 1024
+
+
+def _unique_path(download_folder, img_name, reserved):
+    """Pick a free file name, adding _1, _2 ... like download_image does."""
+    img_path = os.path.join(download_folder, img_name)
+    base_name, ext = os.path.splitext(img_name)
+    counter = 1
+    while os.path.exists(img_path) or img_path in reserved:
+        img_name = f"{base_name}_{counter}{ext}"
+        img_path = os.path.join(download_folder, img_name)
+        counter += 1
+    reserved.add(img_path)
+    return img_name, img_path
+
+
+async def _download_one(session, semaphore, img_url, download_folder, reserved):
+    async with semaphore:
+        try:
+            async with session.get(img_url) as img_response:
+                img_response.raise_for_status()
+
+                # Check if the response content type is an image
+                content_type = img_response.headers.get('Content-Type', '')
+                if 'image' not in content_type:
+                    print(f"Skipping {img_url} (not an image).")
+                    return False
+
+                # The name is reserved before the first await on the body so
+                # two transfers of the same file never pick the same path
+                img_name, img_path = _unique_path(download_folder, sanitize_filename(img_url), reserved)
+
+                # Disk I/O runs on the default thread pool so a slow write never stalls the event loop
+                loop = asyncio.get_running_loop()
+                img_file = await loop.run_in_executor(None, open, img_path, "wb")
+                try:
+                    async for chunk in img_response.content.iter_chunked(CHUNK_SIZE):
+                        await loop.run_in_executor(None, img_file.write, chunk)
+                finally:
+                    await loop.run_in_executor(None, img_file.close)
+
+            print(f"Saved {img_name} to {download_folder}.")
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error downloading {img_url}: {e}")
+            return False
+
+
+async def download_images_async(selected_images, download_folder="downloaded_images",
+                                max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                                per_host_limit=DEFAULT_PER_HOST_LIMIT):
+    """Download every image on a single event loop and return the success count."""
+    if not os.path.exists(download_folder):
+        os.makedirs(download_folder)
+
+    # The connector enforces the per-host limit and keeps connections alive;
+    # the semaphore caps the total number of open transfers (and files)
+    connector = aiohttp.TCPConnector(
+        limit=max_concurrency,
+        limit_per_host=per_host_limit,
+        ttl_dns_cache=DEFAULT_DNS_TTL,
+    )
+    semaphore = asyncio.Semaphore(max_concurrency)
+    reserved = set()
+
+    async with aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT}) as session:
+        tasks = [
+            _download_one(session, semaphore, img_url, download_folder, reserved)
+            for img_url in selected_images
+        ]
+        results = await asyncio.gather(*tasks)
+
+    return sum(1 for success in results if success)
+
+
+def run_async_downloads(selected_images, download_folder="downloaded_images", **limits):
+    """Blocking wrapper so callers without an event loop can use the async engine."""
+    return asyncio.run(download_images_async(selected_images, download_folder, **limits))
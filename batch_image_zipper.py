@@ -1,42 +1,101 @@
 import os
-import requests
+import shutil
+import tempfile
+from retry_policy import get_retry_policy  # Timeouts, backoff and per-host circuit breaker
 from bs4 import BeautifulSoup
 from zipfile import ZipFile
+from archive_utils import entry_name, entry_info
+from parallel_zip import build_zip_parallel
+from sharded_zip import ShardedZipWriter
 from tqdm import tqdm  # Import tqdm for progress bar
+from metrics import add_bytes, fail, timed
 
-def process_images():
-    # Step 1: Parse combined_images.html
-    html_file = "combined_images.html"
-    download_folder = "downloaded_images"
-    zip_file_name = "images.zip"
+SPOOL_MEMORY_BYTES = 16 * 1024 * 1024  # Bodies larger than this spill to a temp file while downloading
 
-    if not os.path.exists(download_folder):
-        os.makedirs(download_folder)
+def stream_images_to_zip(img_urls, zip_file_name="images.zip", deflate_everything=False, max_shard_bytes=None, max_shard_entries=None):
+    """Write each HTTP response into its ZIP entry; no downloaded_images/ copies.
+
+    Each body is spooled (in memory, or a temp file past SPOOL_MEMORY_BYTES)
+    and the entry is only opened once it has fully arrived, so a transfer
+    that fails mid-body leaves nothing behind in the archive.
+
+    JPEG/PNG/WebP are stored as-is, other formats are deflated (or all of
+    them when deflate_everything is set). With max_shard_bytes or
+    max_shard_entries the output is split into images-0001.zip,
+    images-0002.zip, ... plus images-index.json. Returns the number of images zipped.
+    """
+    zipped = 0
+    print("Streaming images into the archive...")
+    if max_shard_bytes or max_shard_entries:
+        archive = ShardedZipWriter(os.path.splitext(zip_file_name)[0], max_shard_bytes, max_shard_entries)
+    else:
+        archive = ZipFile(zip_file_name, "w", allowZip64=True)
+    with archive as zipf:
+        for img_url in tqdm(img_urls, desc="Zipping"):
+            try:
+                # Download and compression overlap here, so the whole entry counts as "archive"
+                with timed("archive"), get_retry_policy().get(img_url, stream=True) as response:
+                    if response.status_code != 200:
+                        print(f"Failed to download: {img_url}")
+                        fail("archive")
+                        continue
+                    content_type = response.headers.get("Content-Type", "")
+                    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as body:
+                        for chunk in response.iter_content(64 * 1024):
+                            body.write(chunk)
+                        zinfo = entry_info(entry_name(zipped + 1, img_url, content_type), content_type, deflate_everything)
+                        zinfo.file_size = body.tell()  # Known up front, so ZipFile picks ZIP64 only when needed
+                        body.seek(0)
+                        with zipf.open(zinfo, "w") as entry:
+                            shutil.copyfileobj(body, entry, 64 * 1024)
+                    add_bytes("archive", bytes_in=zinfo.file_size, bytes_out=zinfo.compress_size)
+                zipped += 1
+            except Exception as e:
+                print(f"Error downloading {img_url}: {e}")
+    print(f"{zipped} images zipped into {zip_file_name}")
+    return zipped
 
-    # Read the HTML file
-    with open(html_file, "r") as file:
-        soup = BeautifulSoup(file, "html.parser")
+def process_images(img_urls=None, html_file="combined_images.html", download_folder="downloaded_images", zip_file_name="images.zip", stream_to_zip=False, parallel_zip=False, max_shard_bytes=None, max_shard_entries=None):
+    # Step 1: Use the URLs passed in, or parse them from combined_images.html
+    if img_urls is None:
+        # Read the HTML file
+        with open(html_file, "r") as file:
+            soup = BeautifulSoup(file, "html.parser")
 
-    # Extract image URLs
-    img_tags = soup.find_all("img")
-    img_urls = [img["src"] for img in img_tags if "src" in img.attrs]
+        # Extract image URLs
+        img_tags = soup.find_all("img")
+        img_urls = [img["src"] for img in img_tags if "src" in img.attrs]
 
     print(f"Found {len(img_urls)} images.")
 
+    if stream_to_zip:
+        # One pass: no downloaded_images/ copies to write, re-read and truncate
+        return stream_images_to_zip(img_urls, zip_file_name, max_shard_bytes=max_shard_bytes, max_shard_entries=max_shard_entries)
+
+    sharded = bool(max_shard_bytes or max_shard_entries)
+    if sharded and parallel_zip:
+        raise ValueError("parallel_zip writes a single archive and cannot be combined with max_shard_bytes/max_shard_entries")
+
+    if not os.path.exists(download_folder):
+        os.makedirs(download_folder)
+
     # Step 2: Download the images with a progress bar
     downloaded_files = []
     print("Downloading images...")
     for idx, img_url in enumerate(tqdm(img_urls, desc="Downloading")):  # Add progress bar
         try:
-            response = requests.get(img_url, stream=True)
-            if response.status_code == 200:
-                file_path = os.path.join(download_folder, f"image_{idx + 1}.jpg")
-                with open(file_path, "wb") as img_file:
-                    for chunk in response.iter_content(1024):
-                        img_file.write(chunk)
-                downloaded_files.append(file_path)
-            else:
-                print(f"Failed to download: {img_url}")
+            with timed("download"):
+                response = get_retry_policy().get(img_url, stream=True)
+                if response.status_code == 200:
+                    file_path = os.path.join(download_folder, f"image_{idx + 1}.jpg")
+                    with open(file_path, "wb") as img_file:
+                        for chunk in response.iter_content(1024):
+                            img_file.write(chunk)
+                    add_bytes("download", bytes_in=os.path.getsize(file_path))
+                    downloaded_files.append(file_path)
+                else:
+                    print(f"Failed to download: {img_url}")
+                    fail("download")
         except Exception as e:
             print(f"Error downloading {img_url}: {e}")
 
@@ -44,10 +103,23 @@ def process_images():
 
     # Step 3: Zip the images
     print("Zipping images...")
-    with ZipFile(zip_file_name, "w") as zipf:
-        for file in downloaded_files:
-            zipf.write(file, os.path.basename(file))
-    print(f"Images zipped into {zip_file_name}")
+    with timed("archive"):
+        if parallel_zip:
+            # Compress on every core; entries keep their download order
+            build_zip_parallel([(os.path.basename(file), file) for file in downloaded_files], zip_file_name)
+            archive_files = [zip_file_name]
+        elif sharded:
+            with ShardedZipWriter(os.path.splitext(zip_file_name)[0], max_shard_bytes, max_shard_entries) as zipf:
+                for file in downloaded_files:
+                    zipf.write(file, os.path.basename(file))
+            archive_files = zipf.shards
+        else:
+            with ZipFile(zip_file_name, "w") as zipf:
+                for file in downloaded_files:
+                    zipf.write(file, os.path.basename(file))
+            archive_files = [zip_file_name]
+    add_bytes("archive", bytes_in=sum(os.path.getsize(file) for file in downloaded_files), bytes_out=sum(os.path.getsize(file) for file in archive_files))
+    print(f"Images zipped into {', '.join(archive_files)}")
 
     # Step 4: Corrupt the images by reducing them to 0 bytes
     print("Corrupting images...")
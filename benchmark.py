@@ -0,0 +1,267 @@
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ERROR_KINDS = ("503", "404", "reset")
+SCENARIOS = ("extract", "download-thread", "download-async", "zip-stream")
+
+
+def make_jpeg(width, height, size_bytes, seed=0):
+    """A real JPEG header of width x height, padded after EOI to size_bytes."""
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (120, 140, 160)).save(buffer, "JPEG", quality=50)
+    data = buffer.getvalue()
+    padding = max(0, size_bytes - len(data))
+    return data + random.Random(seed).randbytes(padding)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # The async engine opens many connections at once
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)  # Clients hanging up early is expected
+
+
+class SyntheticSite:
+    """A local stand-in for an image gallery site, served from a background thread.
+
+    / links to pages /page/<n>.html, each showing images_per_page images at
+    /img/<n>-<m>.jpg. Every response is delayed by latency seconds (+-50%)
+    and error_rate of the image requests fail with a 503, a 404 or a
+    dropped connection. The server counts requests, bytes and per-request
+    latency (time spent in the handler) between reset_stats() calls.
+    """
+
+    def __init__(self, pages=20, images_per_page=20, image_bytes=200 * 1024, image_size=(1200, 1200),
+                 latency=0.01, error_rate=0.0, seed=0):
+        self.pages = pages
+        self.images_per_page = images_per_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.image = make_jpeg(image_size[0], image_size[1], image_bytes, seed)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like a real origin
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site._handle(self)
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def page_urls(self):
+        return [f"{self.base_url}/page/{page}.html" for page in range(self.pages)]
+
+    def image_urls(self):
+        return [
+            f"{self.base_url}/img/{page}-{image}.jpg"
+            for page in range(self.pages)
+            for image in range(self.images_per_page)
+        ]
+
+    def _page_html(self, page):
+        images = "\n".join(
+            f'<figure><img src="/img/{page}-{image}.jpg" alt="Photo {image}"><figcaption>Photo {image}</figcaption></figure>'
+            for image in range(self.images_per_page)
+        )
+        return f"<!DOCTYPE html><html><head><title>Gallery {page}</title></head><body><h1>Gallery {page}</h1>{images}</body></html>"
+
+    def _handle(self, handler):
+        started = time.perf_counter()
+        with self._lock:
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            error = self._random.choice(ERROR_KINDS) if self._random.random() < self.error_rate else None
+        time.sleep(delay)
+
+        path = handler.path.split("?")[0]
+        status, content_type, body = 404, "text/plain", b"not found"
+        if path == "/":
+            links = "".join(f'<a href="{url}">Page {index}</a>' for index, url in enumerate(self.page_urls()))
+            status, content_type, body = 200, "text/html", f"<html><body>{links}</body></html>".encode()
+        elif path.startswith("/page/"):
+            page = int(path[len("/page/"):].split(".")[0])
+            status, content_type, body = 200, "text/html", self._page_html(page).encode()
+        elif path.startswith("/img/"):
+            if error == "reset":
+                handler.close_connection = True  # Drop the connection without a response
+                self._record(started, 0, error)
+                return
+            if error:
+                status, content_type, body = int(error), "text/plain", b"injected error"
+            else:
+                status, content_type, body = 200, "image/jpeg", self.image
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        try:
+            handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Probes close the stream once they have the header
+        self._record(started, len(body), error)
+
+    def _record(self, started, sent, error):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.latencies.append(time.perf_counter() - started)
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.latencies = []
+            self.errors = {}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def _run_scenario(name, page_urls, image_urls, work_dir, quiet=True):
+    """Run one scenario in this (fresh) process; returns items done, seconds and peak RSS."""
+    if quiet:
+        sys.stdout = sys.stderr = open(os.devnull, "w")  # Progress bars and per-image messages
+    started = time.perf_counter()
+    if name == "extract":
+        from main5 import extract_image_urls_from_page  # Static path: no browser needed
+        items = sum(len(extract_image_urls_from_page(url)) for url in page_urls)
+    elif name in ("download-thread", "download-async"):
+        from comQ_Batch_IMG_downloader import download_images_concurrently
+        engine = name.split("-")[1]
+        items = download_images_concurrently(image_urls, os.path.join(work_dir, engine), engine=engine)
+    elif name == "zip-stream":
+        from batch_image_zipper import stream_images_to_zip
+        items = stream_images_to_zip(image_urls, os.path.join(work_dir, "images.zip"))
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+    elapsed = time.perf_counter() - started
+    return {"items": items, "seconds": elapsed, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_benchmark(site, scenarios=SCENARIOS, quiet=True):
+    """Run each scenario in its own process against site and return {scenario: stats}.
+
+    A fresh process per scenario keeps the sessions, caches and peak RSS
+    of one scenario from leaking into the next.
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in scenarios:
+        site.reset_stats()
+        with tempfile.TemporaryDirectory() as work_dir:
+            pool = context.Pool(1)
+            try:
+                run = pool.apply(_run_scenario, (name, site.page_urls(), site.image_urls(), work_dir, quiet))
+            finally:
+                pool.close()
+                pool.join()
+        seconds = run["seconds"] or 1e-9
+        results[name] = {
+            "items": run["items"],
+            "seconds": round(seconds, 3),
+            "items_per_s": round(run["items"] / seconds, 1),
+            "mb_per_s": round(site.bytes_sent / seconds / 1e6, 2),
+            "requests": site.requests,
+            "p50_ms": round(percentile(site.latencies, 0.50) * 1000, 1),
+            "p99_ms": round(percentile(site.latencies, 0.99) * 1000, 1),
+            "errors_injected": dict(site.errors),
+            "peak_rss_mb": round(run["peak_rss_mb"], 1) if run["peak_rss_mb"] else None,
+        }
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result):
+    print(
+        f"{name:>16}: {result['items']} images in {result['seconds']:.2f}s, "
+        f"{result['items_per_s']:.1f} images/s, {result['mb_per_s']:.2f} MB/s, "
+        f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+        f"peak RSS {result['peak_rss_mb']} MB, injected errors {result['errors_injected']}"
+    )
+
+
+def compare_to_baseline(results, baseline_file, tolerance=0.10):
+    """Print and return the scenarios that got slower or bigger than the saved baseline by more than tolerance."""
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["items_per_s"] < before["items_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['items_per_s']} -> {result['items_per_s']} images/s")
+        if result["peak_rss_mb"] and before.get("peak_rss_mb") and result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {baseline_file}")
+    return regressions
+
+
+if __name__ == "__main__":
+    # Synthetic site: pages x images_per_page images of image_bytes each
+    pages = 10
+    images_per_page = 20
+    image_bytes = 200 * 1024
+    latency = 0.02  # Seconds per response (+-50%)
+    error_rate = 0.02  # Fraction of image requests that fail
+    results_file = "benchmark_results.json"
+    baseline_file = None  # e.g. a previous benchmark_results.json to flag regressions
+
+    with SyntheticSite(pages, images_per_page, image_bytes, latency=latency, error_rate=error_rate) as site:
+        print(f"Benchmarking {pages} pages x {images_per_page} images of {image_bytes // 1024} KB at {site.base_url}")
+        results = run_benchmark(site)
+
+    with open(results_file, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {results_file}")
+    if baseline_file:
+        compare_to_baseline(results, baseline_file)
@@ -0,0 +1,108 @@
+import os
+import queue
+import threading
+import time
+
+from driver_manager import DriverManager
+
+# Rough resident size of one headless Chrome rendering a gallery page
+CHROME_MEMORY_MB = 400
+
+
+def _available_memory_mb():
+    """Return available RAM in MB, or None if it cannot be determined."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None  # e.g. Windows
+
+
+def max_browser_workers(requested=None, memory_per_browser_mb=CHROME_MEMORY_MB):
+    """Number of browsers to run: requested (default: CPU count), capped by free RAM."""
+    workers = requested or os.cpu_count() or 1
+    available_mb = _available_memory_mb()
+    if available_mb is not None:
+        workers = min(workers, max(1, available_mb // memory_per_browser_mb))
+    return max(1, workers)
+
+
+def render_pages_concurrently(urls, extract, all_image_urls, workers=None, claim_next=None):
+    """Render pages on a pool of headless browsers.
+
+    Each worker thread owns one DriverManager and calls
+    extract(url, driver_manager=...) for the pages it takes from the queue.
+    The image URLs it returns are added to the shared all_image_urls set.
+    With claim_next (e.g. CrawlState.claim_next), workers pull their pages
+    from it instead, until it returns None; urls then only sizes the pool.
+    Returns a list of per-worker stats dicts.
+    """
+    if not urls:
+        return []
+    # Never start more browsers than there are pages
+    workers = min(max_browser_workers(workers), len(urls))
+    url_queue = queue.Queue()
+    for url in urls:
+        url_queue.put(url)
+
+    def next_url():
+        if claim_next is not None:
+            return claim_next()
+        try:
+            return url_queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    results_lock = threading.Lock()
+    stats = [
+        {"worker": index, "pages": 0, "images": 0, "errors": 0, "busy_seconds": 0.0}
+        for index in range(workers)
+    ]
+
+    def worker(worker_stats):
+        with DriverManager() as driver_manager:
+            while True:
+                url = next_url()
+                if url is None:
+                    return
+                print(f"[browser {worker_stats['worker']}] Processing URL: {url}")
+                started = time.monotonic()
+                try:
+                    image_urls = extract(url, driver_manager=driver_manager)
+                    with results_lock:
+                        all_image_urls.update(image_urls)
+                    worker_stats["images"] += len(image_urls)
+                    print(f"Found {len(image_urls)} valid image URLs from {url}")
+                except Exception as e:
+                    worker_stats["errors"] += 1
+                    print(f"An error occurred while processing {url}: {e}")
+                finally:
+                    worker_stats["pages"] += 1
+                    worker_stats["busy_seconds"] += time.monotonic() - started
+
+    print(f"Rendering {len(urls)} pages with {workers} browser workers")
+    threads = [threading.Thread(target=worker, args=(worker_stats,), daemon=True) for worker_stats in stats]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for worker_stats in stats:
+        busy = worker_stats["busy_seconds"]
+        worker_stats["pages_per_minute"] = worker_stats["pages"] * 60 / busy if busy else 0.0
+    return stats
+
+
+def print_worker_stats(stats):
+    for worker_stats in stats:
+        print(
+            f"[browser {worker_stats['worker']}] {worker_stats['pages']} pages, "
+            f"{worker_stats['images']} images, {worker_stats['errors']} errors, "
+            f"{worker_stats['busy_seconds']:.1f}s busy, {worker_stats['pages_per_minute']:.1f} pages/min"
+        )
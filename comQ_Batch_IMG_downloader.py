@@ -1,30 +1,55 @@
 import os
 import requests
+from http_cache import cached_get, enable_cache  # Shared keep-alive session + conditional-request cache
 from bs4 import BeautifulSoup
-from urllib.parse import urlsplit, parse_qs
+from responsive_images import lazy_image_urls  # URLs hidden in data-src, data-srcset, background-image
+from urllib.parse import urlsplit, urljoin
 import re
-from concurrent.futures import ThreadPoolExecutor  # For parallel downloading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # For parallel downloading
 from tqdm import tqdm  # Import tqdm for the progress bar
-
-# Step 1: Save the webpage source as index.html
+from content_store import ContentStore  # Deduplicating image store
+from http_session import ensure_pool_size, get_session
+from filename_utils import sanitize_filename  # Shared with the async engine
+from resumable import part_path_for, resume_headers, start_offset, save_validator, is_complete, finish_part, discard_part
+from host_limiter import HostLimiter, host_of, print_host_stats  # Adaptive per-host concurrency
+from retry_policy import get_retry_policy  # Timeouts, backoff and per-host circuit breaker
+from metrics import add_bytes, enable_export, fail, timed  # Per-stage timings and byte counts
+from profiling import profile_stage  # Set URL_IMG_PROFILE=deterministic or sample to profile stages
+
+# Step 1: Fetch the webpage source (and optionally save it as index.html)
 def save_page_source(url, filename="index.html"):
+    """Return the page source; it is also written to filename unless that is None."""
     try:
         # Fetch the webpage content
-        response = requests.get(url)
+        response = cached_get(url)
         response.raise_for_status()
 
         # Save the page source as index.html
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(response.text)
-        print(f"Page source saved to {filename}.")
+        if filename:
+            with open(filename, "w", encoding="utf-8") as file:
+                file.write(response.text)
+            print(f"Page source saved to {filename}.")
+        return response.text
     except requests.exceptions.RequestException as e:
         print(f"Error fetching the website: {e}")
+        return None
 
 # Step 2: Extract image links from the saved HTML page
-def extract_image_links_from_html(filename="index.html", max_images=10, min_width=0, min_height=0):
+def extract_image_links_from_html(filename="index.html", max_images=10, min_width=0, min_height=0, base_url=""):
     try:
         with open(filename, "r", encoding="utf-8") as file:
-            soup = BeautifulSoup(file, "html.parser")
+            page_source = file.read()
+    except Exception as e:
+        print(f"Error reading {filename}: {e}")
+        return []
+    return extract_image_links_from_source(page_source, base_url, max_images, min_width, min_height)
+
+def extract_image_links_from_source(page_source, base_url="", max_images=10, min_width=0, min_height=0):
+    """Extract image links from page source held in memory."""
+    try:
+        soup = BeautifulSoup(page_source, "html.parser")
         
         # Find all anchor tags that contain image links
         a_tags = soup.find_all("a", href=re.compile(r"\.(jpg|jpeg|png|gif|bmp|webp)$", re.IGNORECASE))
@@ -42,14 +67,22 @@ def extract_image_links_from_html(filename="index.html", max_images=10, min_widt
             if img_url.startswith("//"):
                 img_url = f"http:{img_url}"
             elif img_url.startswith("/"):
-                img_url = f"{url.rstrip('/')}{img_url}"
+                img_url = urljoin(base_url, img_url)
 
             valid_images.append(img_url)
             count += 1
 
+        # Lazy-loaded galleries keep the real URLs in attributes a browser would swap in
+        for img_url in lazy_image_urls(soup, base_url):
+            if count >= max_images:
+                break
+            if img_url not in valid_images:
+                valid_images.append(img_url)
+                count += 1
+
         return valid_images
     except Exception as e:
-        print(f"Error reading {filename}: {e}")
+        print(f"Error parsing page source: {e}")
         return []
 
 # Step 3: Save the image links to an HTML file (images.html)
@@ -106,39 +139,25 @@ def save_images_to_html(image_links, output_file="images.html"):
     except Exception as e:
         print(f"Error saving images to HTML: {e}")
 
-# Step 4: Sanitize the filename
-def sanitize_filename(img_url):
-    """Sanitize the filename by extracting it from the URL query string."""
-    
-    # Check if the URL has a query string with 'f='
-    parsed_url = urlsplit(img_url)
-    query_params = parse_qs(parsed_url.query)
-    
-    # If there's a query parameter 'f', use it to extract the filename
-    if 'f' in query_params:
-        filename = query_params['f'][0]  # Get the filename from the 'f' parameter
-    else:
-        # Fallback to the base name from the URL path if 'f' is not present
-        filename = os.path.basename(parsed_url.path)
-
-    # Print to check the filename before sanitization
-    print(f"Base filename before sanitization: {filename}")
-
-    # Remove '%20' (space encoding) completely
-    filename = filename.replace('%20', '')  # Remove '%20' (spaces)
-
-    # Optionally, sanitize any other unwanted characters (e.g., invalid filesystem characters)
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-
-    print(f"Sanitized filename after removing invalid characters: {filename}")
-    
-    return filename
-
 # Step 5: Download image
-def download_image(img_url, download_folder="downloaded_images"):
-    """Download image from the URL and save it to the specified folder."""
-    if not os.path.exists(download_folder):
-        os.makedirs(download_folder)
+@timed("download")
+@profile_stage("download_image")
+def download_image(img_url, download_folder="downloaded_images", store=None, limiter=None, retry_policy=None):
+    """Download image from the URL and save it to the specified folder.
+
+    With a ContentStore the bytes go into the store instead, and URLs whose
+    content is already stored are skipped. Requests go through a RetryPolicy
+    (the shared one by default), and a HostLimiter is told how each attempt
+    went so it can adjust the host's concurrency.
+    """
+    retry_policy = retry_policy or get_retry_policy()
+    if store is not None:
+        stored_path = store.lookup(img_url)
+        if stored_path:
+            print(f"Skipping {img_url} (already stored as {stored_path}).")
+            return True
+    else:
+        os.makedirs(download_folder, exist_ok=True)  # Several worker threads may get here at once
 
     try:
         print(f"Downloading {img_url}...")
@@ -148,17 +167,49 @@ def download_image(img_url, download_folder="downloaded_images"):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
-        img_response = requests.get(img_url, headers=headers, stream=True)
+        # Get the sanitized image filename
+        img_name = sanitize_filename(img_url)  # Sanitize filename to keep the desired part
+
+        # Continue an interrupted transfer of this URL from its .part file
+        part_path = part_path_for(download_folder, img_name, img_url)
+        resume_from, range_headers = resume_headers(part_path) if store is None else (0, {})
+        # Bodies bound for a .part file go to the server directly: the cache reads the whole
+        # body before returning, so a transfer cut short would leave nothing to resume from
+        send = get_session().get if store is None else cached_get
+
+        if resume_from:
+            img_response = retry_policy.get(img_url, send=send, observer=limiter,
+                                            headers={**headers, **range_headers}, stream=True)
+            if img_response.status_code == 416:
+                # Range Not Satisfiable: the .part file is unusable, start over
+                discard_part(part_path)
+                resume_from = 0
+                img_response = retry_policy.get(img_url, send=send, observer=limiter, headers=headers, stream=True)
+        else:
+            img_response = retry_policy.get(img_url, send=send, observer=limiter, headers=headers, stream=True)
         img_response.raise_for_status()
 
         # Check if the response content type is an image
         content_type = img_response.headers.get('Content-Type', '')
         if 'image' not in content_type:
             print(f"Skipping {img_url} (not an image).")
+            fail("download")
             return False  # Return False if the image isn't downloaded
 
-        # Get the sanitized image filename
-        img_name = sanitize_filename(img_url)  # Sanitize filename to keep the desired part
+        if store is not None:
+            # Hash while streaming; the same bytes from another URL are kept only once
+            total_size = int(img_response.headers.get('Content-Length', 0))
+            ext = os.path.splitext(urlsplit(img_url).path)[1].lower()
+            with tqdm(total=total_size, unit='B', unit_scale=True, desc=img_url[-40:]) as pbar:
+                def chunks():
+                    for chunk in img_response.iter_content(chunk_size=64 * 1024):
+                        pbar.update(len(chunk))
+                        yield chunk
+                digest, stored_path, is_new = store.put_stream(img_url, chunks(), ext, content_type)
+                add_bytes("download", bytes_in=pbar.n)
+            print(f"{'Stored' if is_new else 'Already had'} {stored_path} for {img_url}.")
+            return True
+
         img_path = os.path.join(download_folder, img_name)
 
         # Check if filename exists already, then add a number to avoid overwriting
@@ -170,19 +221,33 @@ def download_image(img_url, download_folder="downloaded_images"):
                 img_path = os.path.join(download_folder, img_name)
                 counter += 1
 
-        # Download image with progress bar
-        with open(img_path, "wb") as img_file:
-            total_size = int(img_response.headers.get('Content-Length', 0))
+        # Download image with progress bar into the .part file; append if the server sent the missing range
+        offset = start_offset(img_response, resume_from)
+        if offset:
+            print(f"Resuming {img_name} at byte {offset}.")
+        else:
+            save_validator(part_path, img_response)
+        with open(part_path, "ab" if offset else "wb") as img_file:
+            total_size = offset + int(img_response.headers.get('Content-Length', 0))
             chunk_size = 1024  # Download in 1k chunks
-            with tqdm(total=total_size, unit='B', unit_scale=True, desc=img_name) as pbar:
+            with tqdm(total=total_size, initial=offset, unit='B', unit_scale=True, desc=img_name) as pbar:
                 for chunk in img_response.iter_content(chunk_size=chunk_size):
                     img_file.write(chunk)
                     pbar.update(len(chunk))
+                add_bytes("download", bytes_in=pbar.n - offset)
 
+        if not is_complete(part_path, img_response, offset):
+            print(f"Transfer of {img_url} ended early; kept {part_path} to resume later.")
+            fail("download")
+            return False
+
+        # Only complete images ever get the final name
+        finish_part(part_path, img_path)
         print(f"Saved {img_name} to {download_folder}.")
         return True  # Return True if download was successful
     except requests.exceptions.RequestException as e:
         print(f"Error downloading {img_url}: {e}")
+        fail("download")
         return False  # Return False if download failed
 
 # Step 6: Ask user to download or skip the image
@@ -200,17 +265,69 @@ def ask_user_to_download_image(img_url):
         return ask_user_to_download_image(img_url)
 
 # Step 7: Download selected images concurrently
-def download_images_concurrently(selected_images, download_folder="downloaded_images"):
-    """Download multiple images concurrently with a progress bar."""
+def download_images_concurrently(selected_images, download_folder="downloaded_images", engine="thread", store=None,
+                                 max_workers=32, limiter=None):
+    """Download multiple images concurrently with a progress bar.
+
+    engine="thread" uses a thread pool whose per-host parallelism is tuned
+    by a HostLimiter; engine="async" runs every transfer on one asyncio
+    event loop (see async_downloader.py). The async engine writes plain
+    files only, so it cannot be combined with a ContentStore or HostLimiter.
+    """
+    if engine == "async":
+        if store is not None or limiter is not None:
+            raise ValueError("The async engine supports neither a content store nor a host limiter; use engine=\"thread\"")
+        from async_downloader import run_async_downloads  # Needs aiohttp
+        return run_async_downloads(selected_images, download_folder)
+    if engine != "thread":
+        raise ValueError(f"Unknown download engine: {engine}")
+
     downloaded_count = 0  # Counter for successfully downloaded images
+    limiter = limiter or HostLimiter(max_limit=max_workers)
+    # Keep a pooled connection for every transfer a host can have in flight
+    ensure_pool_size(min(limiter.max_limit, max_workers))
+
+    # One queue per host, so a throttled host's backlog never holds up the others
+    queues = {}
+    for img_url in selected_images:
+        queues.setdefault(host_of(img_url), deque()).append(img_url)
+
+    def download(img_url):
+        try:
+            return download_image(img_url, download_folder, store, limiter)
+        finally:
+            limiter.release(img_url)
 
     # Using ThreadPoolExecutor to download images concurrently
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Track successful downloads
-        for success in executor.map(lambda img_url: download_image(img_url, download_folder), selected_images):
-            if success:
-                downloaded_count += 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        while queues or in_flight:
+            # max_workers only caps the total; a URL is handed to a worker only once its host has a free slot.
+            # Hosts take turns, one URL each per round, until the pool is full or no host has a slot left.
+            dispatched = True
+            while dispatched and len(in_flight) < max_workers:
+                dispatched = False
+                for host, queue in list(queues.items()):
+                    if len(in_flight) >= max_workers:
+                        break
+                    if limiter.try_acquire(queue[0]):
+                        in_flight.add(executor.submit(download, queue.popleft()))
+                        dispatched = True
+                        if not queue:
+                            del queues[host]
+            # Wake up when a transfer finishes, or when a host paused by Retry-After can go again
+            paused = [limiter.ready_in(queue[0]) for queue in queues.values()]
+            timeout = min([delay for delay in paused if delay > 0], default=None)
+            if not in_flight:
+                time.sleep(timeout or 0.1)
+                continue
+            done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            # Track successful downloads
+            for future in done:
+                if future.result():
+                    downloaded_count += 1
 
+    print_host_stats(limiter.stats())
     return downloaded_count
 
 # Main code to execute the steps
@@ -222,12 +339,22 @@ if __name__ == "__main__":
     max_images = 0  # Maximum number of images to extract
     min_width = 0   # Minimum width of images (in pixels)
     min_height = 0  # Minimum height of images (in pixels)
+    page_source_file = None  # Set to "index.html" to keep a copy of the page source
+    download_engine = "thread"  # "thread" or "async" (for thousands of images)
+    content_store_dir = None  # e.g. "image_store" to keep one copy of each unique image (thread engine only)
+    http_cache_dir = None  # e.g. "http_cache" so re-runs only fetch pages (and content-store images) that changed
+    metrics_file = "metrics.json"  # Per-stage timings, bytes and per-host errors, written at exit
+    metrics_port = None  # e.g. 9108 to serve Prometheus text at /metrics during the run
+
+    enable_export(metrics_file, metrics_port)
+    if http_cache_dir:
+        enable_cache(http_cache_dir)
 
-    # Step 1: Save the webpage source as index.html
-    save_page_source(website_url)
+    # Step 1: Fetch the webpage source (kept in memory)
+    page_source = save_page_source(website_url, page_source_file)
 
-    # Step 2: Extract image links from the saved index.html
-    image_links = extract_image_links_from_html("index.html", max_images, min_width, min_height)
+    # Step 2: Extract image links straight from the fetched source
+    image_links = extract_image_links_from_source(page_source or "", website_url, max_images, min_width, min_height)
 
     # Step 3: Save the extracted images to images.html
     save_images_to_html(image_links)
@@ -241,7 +368,8 @@ if __name__ == "__main__":
 
     # Step 5: Download selected images concurrently with progress bar
     if selected_images:
-        downloaded_count = download_images_concurrently(selected_images)
+        store = ContentStore(content_store_dir) if content_store_dir else None
+        downloaded_count = download_images_concurrently(selected_images, engine=download_engine, store=store)
 
         # Print the total number of images downloaded
         print(f"\nTotal images downloaded: ({downloaded_count}/{len(selected_images)})")
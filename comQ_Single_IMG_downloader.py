@@ -1,28 +1,43 @@
 import os
 import requests
+from http_session import get_session  # Shared keep-alive session
 from bs4 import BeautifulSoup
-from urllib.parse import urlsplit, parse_qs
+from responsive_images import lazy_image_urls  # URLs hidden in data-src, data-srcset, background-image
+from urllib.parse import urlsplit, parse_qs, urljoin
 import re
 
-# Step 1: Save the webpage source as index.html
+# Step 1: Fetch the webpage source (and optionally save it as index.html)
 def save_page_source(url, filename="index.html"):
+    """Return the page source; it is also written to filename unless that is None."""
     try:
         # Fetch the webpage content
-        response = requests.get(url)
+        response = get_session().get(url)
         response.raise_for_status()
 
         # Save the page source as index.html
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(response.text)
-        print(f"Page source saved to {filename}.")
+        if filename:
+            with open(filename, "w", encoding="utf-8") as file:
+                file.write(response.text)
+            print(f"Page source saved to {filename}.")
+        return response.text
     except requests.exceptions.RequestException as e:
         print(f"Error fetching the website: {e}")
+        return None
 
 # Step 2: Extract image links from the saved HTML page
-def extract_image_links_from_html(filename="index.html", max_images=10, min_width=0, min_height=0):
+def extract_image_links_from_html(filename="index.html", max_images=10, min_width=0, min_height=0, base_url=""):
     try:
         with open(filename, "r", encoding="utf-8") as file:
-            soup = BeautifulSoup(file, "html.parser")
+            page_source = file.read()
+    except Exception as e:
+        print(f"Error reading {filename}: {e}")
+        return []
+    return extract_image_links_from_source(page_source, base_url, max_images, min_width, min_height)
+
+def extract_image_links_from_source(page_source, base_url="", max_images=10, min_width=0, min_height=0):
+    """Extract image links from page source held in memory."""
+    try:
+        soup = BeautifulSoup(page_source, "html.parser")
         
         # Find all anchor tags that contain image links
         a_tags = soup.find_all("a", href=re.compile(r"\.(jpg|jpeg|png|gif|bmp|webp)$", re.IGNORECASE))
@@ -40,14 +55,22 @@ def extract_image_links_from_html(filename="index.html", max_images=10, min_widt
             if img_url.startswith("//"):
                 img_url = f"http:{img_url}"
             elif img_url.startswith("/"):
-                img_url = f"{url.rstrip('/')}{img_url}"
+                img_url = urljoin(base_url, img_url)
 
             valid_images.append(img_url)
             count += 1
 
+        # Lazy-loaded galleries keep the real URLs in attributes a browser would swap in
+        for img_url in lazy_image_urls(soup, base_url):
+            if count >= max_images:
+                break
+            if img_url not in valid_images:
+                valid_images.append(img_url)
+                count += 1
+
         return valid_images
     except Exception as e:
-        print(f"Error reading {filename}: {e}")
+        print(f"Error parsing page source: {e}")
         return []
 
 # Step 3: Save the image links to an HTML file (images.html)
@@ -146,7 +169,7 @@ def download_image(img_url, download_folder="downloaded_images"):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
-        img_response = requests.get(img_url, headers=headers)
+        img_response = get_session().get(img_url, headers=headers)
         img_response.raise_for_status()
 
         # Check if the response content type is an image
@@ -197,12 +220,13 @@ if __name__ == "__main__":
     max_images = 0  # Maximum number of images to extract
     min_width = 0   # Minimum width of images (in pixels)
     min_height = 0  # Minimum height of images (in pixels)
+    page_source_file = None  # Set to "index.html" to keep a copy of the page source
 
-    # Step 1: Save the webpage source as index.html
-    save_page_source(website_url)
+    # Step 1: Fetch the webpage source (kept in memory)
+    page_source = save_page_source(website_url, page_source_file)
 
-    # Step 2: Extract image links from the saved index.html
-    image_links = extract_image_links_from_html("index.html", max_images, min_width, min_height)
+    # Step 2: Extract image links straight from the fetched source
+    image_links = extract_image_links_from_source(page_source or "", website_url, max_images, min_width, min_height)
 
     # Step 3: Save the extracted images to images.html
     save_images_to_html(image_links)
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+class ContentStore:
+    """Store each unique image once, named by the SHA-256 of its bytes.
+
+    Blobs live under <root>/objects/<first two hex digits>/<digest><ext>.
+    An SQLite index maps every URL to the digest of what it served, so a
+    later run can skip URLs whose content is already stored.
+    """
+
+    def __init__(self, root="image_store"):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, path TEXT, size INTEGER, content_type TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT REFERENCES blobs(digest))")
+
+    def lookup(self, url):
+        """Return the stored path for url, or None if its content is unknown."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blobs.path FROM urls JOIN blobs ON urls.digest = blobs.digest WHERE urls.url = ?", (url,)
+            ).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def put_stream(self, url, chunks, ext="", content_type=""):
+        """Hash and spool chunks to disk, keeping the blob only if it is new.
+
+        Returns (digest, path, is_new).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            hex_digest = digest.hexdigest()
+
+            with self._lock:
+                row = self._db.execute("SELECT path FROM blobs WHERE digest = ?", (hex_digest,)).fetchone()
+                is_new = row is None or not os.path.exists(row[0])
+                if is_new:
+                    blob_dir = os.path.join(self.objects_dir, hex_digest[:2])
+                    os.makedirs(blob_dir, exist_ok=True)
+                    path = os.path.join(blob_dir, hex_digest + ext)
+                    os.replace(temp_path, path)
+                else:
+                    path = row[0]
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO blobs (digest, path, size, content_type) VALUES (?, ?, ?, ?)",
+                        (hex_digest, path, size, content_type),
+                    )
+                    self._db.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, hex_digest))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)  # Duplicate content or failed transfer
+        return hex_digest, path, is_new
+
+    def stats(self):
+        """Return the number of URLs seen, unique blobs and bytes stored."""
+        with self._lock:
+            urls = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"urls": urls, "blobs": blobs, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlState:
+    """Persistent crawl progress in an SQLite database (WAL mode).
+
+    Every page is pending, in_progress, done or failed, and the images
+    found on a page are stored with it. Each thread gets its own
+    connection; WAL plus a busy timeout lets several workers (threads or
+    processes) write at the same time.
+    """
+
+    def __init__(self, path="crawl_state.sqlite3", busy_timeout=30):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS images (page_url TEXT NOT NULL, image_url TEXT NOT NULL, "
+                "PRIMARY KEY (page_url, image_url))"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            db.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs
+            self._local.db = db
+        return db
+
+    def get_meta(self, key):
+        row = self._db().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def add_pages(self, urls):
+        """Queue pages; pages already known keep their status."""
+        now = time.time()
+        with self._db() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO pages (url, status, updated_at) VALUES (?, ?, ?)",
+                [(url, PENDING, now) for url in urls],
+            )
+
+    def recover(self, retry_failed=True):
+        """Requeue pages left in_progress by a crash (and failed ones, if asked).
+
+        Call once at start-up, before any worker is running.
+        """
+        statuses = (IN_PROGRESS, FAILED) if retry_failed else (IN_PROGRESS,)
+        placeholders = ",".join("?" for _ in statuses)
+        with self._db() as db:
+            cursor = db.execute(
+                f"UPDATE pages SET status = ?, updated_at = ? WHERE status IN ({placeholders})",
+                (PENDING, time.time()) + statuses,
+            )
+        return cursor.rowcount
+
+    def pending_urls(self):
+        return [row[0] for row in self._db().execute("SELECT url FROM pages WHERE status = ? ORDER BY rowid", (PENDING,))]
+
+    def claim_next(self):
+        """Atomically move one pending page to in_progress and return its URL.
+
+        Safe to call from several processes sharing the database.
+        """
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")  # Take the write lock before reading
+        try:
+            row = db.execute("SELECT url FROM pages WHERE status = ? ORDER BY rowid LIMIT 1", (PENDING,)).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE pages SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                    (IN_PROGRESS, time.time(), row[0]),
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return row[0] if row else None
+
+    def mark_done(self, url, image_urls):
+        """Record the page's images and mark it done in one transaction."""
+        with self._db() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO images (page_url, image_url) VALUES (?, ?)",
+                [(url, image_url) for image_url in image_urls],
+            )
+            db.execute("UPDATE pages SET status = ?, error = NULL, updated_at = ? WHERE url = ?", (DONE, time.time(), url))
+
+    def mark_failed(self, url, error):
+        with self._db() as db:
+            db.execute(
+                "UPDATE pages SET status = ?, error = ?, updated_at = ? WHERE url = ?",
+                (FAILED, str(error), time.time(), url),
+            )
+
+    def image_urls(self):
+        """Every image found so far, across runs."""
+        return {row[0] for row in self._db().execute("SELECT DISTINCT image_url FROM images")}
+
+    def counts(self):
+        return dict(self._db().execute("SELECT status, COUNT(*) FROM pages GROUP BY status").fetchall())
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
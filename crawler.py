@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import os
+import posixpath
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from driver_manager import DriverManager
+from static_extractor import fetch_page_soup
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+# Links to these are files, not pages
+SKIP_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".bmp", ".ico", ".pdf", ".zip", ".rar", ".7z",
+    ".mp4", ".webm", ".mp3", ".css", ".js", ".json", ".xml",
+}
+GALLERY_WORDS = ("gallery", "album", "photo", "image", "img", "picture", "wallpaper", "collection")
+
+
+def canonicalize_url(url, base=None):
+    """Return one spelling per page, or None for links that are not http(s) pages.
+
+    Resolves url against base, lowercases scheme and host, drops default
+    ports, fragments and tracking parameters, and sorts the query.
+    """
+    try:
+        parts = urlsplit(urljoin(base, url.strip()) if base else url.strip())
+        port = parts.port
+    except ValueError:
+        return None  # Malformed (e.g. bad port or IPv6 literal)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if scheme not in ("http", "https") or not host:
+        return None
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ))
+    path = parts.path or "/"
+    if "/." in path:
+        # Resolve "." and ".." segments, keeping a trailing slash
+        path = posixpath.normpath(path) + ("/" if path.endswith("/") and path != "/" else "")
+        path = "/" + path.lstrip("/")
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def gallery_priority(url, depth):
+    """Default score for priority crawling: gallery-looking URLs first, then shallower pages."""
+    path = urlsplit(url).path.lower()
+    return sum(word in path for word in GALLERY_WORDS) * 2 - depth
+
+
+class Crawler:
+    """Crawl a site breadth-first (or by priority) up to max_depth and max_pages.
+
+    Every link is canonicalized and checked against a seen-set before it
+    enters the frontier, so no page is fetched twice. Each page is fetched
+    once with fetch_page_soup(); extract(url, soup) is then run on the same
+    soup, and its return value is kept per page. Links are followed when
+    they stay on domain or one of its subdomains (default: the seed's host).
+    A page goes to the browser only when nothing in its static HTML matches
+    required_selector (default: a link_selector link or an <img>).
+    """
+
+    def __init__(self, seed_url, domain=None, max_depth=3, max_pages=200, extract=None, strategy="bfs",
+                 priority=gallery_priority, link_selector="a[href]", workers=4, required_selector=None, static_first=True):
+        if strategy not in ("bfs", "priority"):
+            raise ValueError(f"Unknown crawl strategy: {strategy}")
+        self.seed_url = canonicalize_url(seed_url)
+        if self.seed_url is None:
+            raise ValueError(f"Not an http(s) URL: {seed_url}")
+        self.domain = (domain or urlsplit(self.seed_url).hostname).lower()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.extract = extract
+        self.strategy = strategy
+        self.priority = priority
+        self.link_selector = link_selector
+        self.workers = workers
+        # Links and images come from the same fetch, so static HTML with either one will do
+        self.required_selector = required_selector or f"{link_selector}, img"
+        self.static_first = static_first
+
+        self.seen = set()
+        self.results = {}  # page url -> extract() result
+        self.depths = {}
+        self.errors = {}
+        self._frontier = []
+        self._order = itertools.count()  # Tie-breaker: equal keys keep discovery order
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+    def _push(self, url, depth):
+        if url in self.seen or depth > self.max_depth:
+            return
+        self.seen.add(url)
+        self.depths[url] = depth
+        key = depth if self.strategy == "bfs" else -self.priority(url, depth)
+        heapq.heappush(self._frontier, (key, next(self._order), url, depth))
+
+    def _follow(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if not (host == self.domain or host.endswith("." + self.domain)):
+            return False
+        return os.path.splitext(parts.path)[1].lower() not in SKIP_EXTENSIONS
+
+    def _driver_manager(self):
+        # One lazily started browser per worker thread, only for pages that need rendering
+        driver_manager = getattr(self._local, "driver_manager", None)
+        if driver_manager is None:
+            driver_manager = self._local.driver_manager = DriverManager()
+            with self._drivers_lock:
+                self._drivers.append(driver_manager)
+        return driver_manager
+
+    def _visit(self, url):
+        soup, path = fetch_page_soup(url, self.required_selector, self._driver_manager(), self.static_first)
+        links = []
+        for a_tag in soup.select(self.link_selector):
+            link = canonicalize_url(a_tag.get("href", ""), url)
+            if link and self._follow(link):
+                links.append(link)
+        result = self.extract(url, soup) if self.extract else None
+        return links, result
+
+    def crawl(self):
+        """Run the crawl and return {page url: extract() result} for every page fetched."""
+        self._push(self.seed_url, 0)
+        fetched = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                in_flight = {}
+                while self._frontier or in_flight:
+                    # Keep every worker busy while the page budget lasts
+                    while self._frontier and len(in_flight) < self.workers and fetched < self.max_pages:
+                        _, _, url, depth = heapq.heappop(self._frontier)
+                        in_flight[executor.submit(self._visit, url)] = (url, depth)
+                        fetched += 1
+                    if not in_flight:
+                        break  # Page budget spent
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, depth = in_flight.pop(future)
+                        try:
+                            links, result = future.result()
+                        except Exception as e:
+                            self.errors[url] = str(e)
+                            print(f"An error occurred while processing {url}: {e}")
+                            continue
+                        self.results[url] = result
+                        for link in links:
+                            self._push(link, depth + 1)
+                        print(f"[depth {depth}] {url}: {len(links)} links, {len(self._frontier)} queued")
+        finally:
+            for driver_manager in self._drivers:
+                driver_manager.quit()
+        print(
+            f"Crawled {len(self.results)} pages ({len(self.errors)} failed, {len(self._frontier)} left in the frontier) "
+            f"from {self.seed_url}, max depth {self.max_depth}"
+        )
+        return self.results
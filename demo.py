@@ -1,22 +1,10 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from static_extractor import fetch_page_soup
 from urllib.parse import urlparse
 
-def extract_href_from_page(url, domain):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
+def extract_href_from_page(url, domain, driver_manager=None, static_first=True):
     try:
-        driver.get(url)
-        driver.implicitly_wait(10)
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        # Plain HTTP first, headless Chrome only if the page needs rendering
+        soup, path = fetch_page_soup(url, 'a[href]', driver_manager, static_first)
         
         urls = set()
         # Look for <a> tags that might contain image links
@@ -31,8 +19,6 @@ def extract_href_from_page(url, domain):
     except Exception as e:
         print(f"An error occurred: {e}")
         return set()
-    finally:
-        driver.quit()
 
 def output_to_html(urls, output_file, max_images):
     with open(output_file, 'w') as file:
@@ -0,0 +1,141 @@
+import atexit
+import threading
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from driver_resolver import resolve_driver_path
+from http_session import USER_AGENT
+
+
+class DriverManager:
+    """Keep one headless Chrome alive and reuse it for every page.
+
+    State (cookies, storage, current page) is cleared between pages, and
+    a crashed or unreachable browser is restarted on the next load.
+    """
+
+    def __init__(self, headless=True, user_agent=USER_AGENT, implicit_wait=10, page_load_timeout=60):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.implicit_wait = implicit_wait
+        self.page_load_timeout = page_load_timeout
+        self.driver = None
+        self.restarts = 0
+        self._origins = set()  # Origins whose storage the current page may have touched
+
+    def _options(self):
+        chrome_options = Options()
+        if self.headless:
+            chrome_options.add_argument("--headless")  # Run in headless mode
+        chrome_options.add_argument(f"user-agent={self.user_agent}")
+        return chrome_options
+
+    def start(self):
+        """Launch Chrome if it is not running yet and return the driver."""
+        if self.driver is None:
+            service = Service(resolve_driver_path())
+            self.driver = webdriver.Chrome(service=service, options=self._options())
+            self.driver.implicitly_wait(self.implicit_wait)
+            self.driver.set_page_load_timeout(self.page_load_timeout)
+        return self.driver
+
+    def restart(self):
+        """Throw away the current browser and start a fresh one."""
+        self.quit()
+        self.restarts += 1
+        return self.start()
+
+    def _remember_origins(self):
+        """Note the origins of the page and everything it loaded (iframes, third-party scripts)."""
+        try:
+            urls = [self.driver.current_url] + self.driver.execute_script(
+                "return performance.getEntriesByType('resource').map(entry => entry.name);"
+            )
+        except WebDriverException:
+            return
+        for url in urls:
+            parts = urlsplit(url)
+            if parts.scheme in ("http", "https") and parts.netloc:
+                self._origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    def reset(self):
+        """Clear cookies and storage for every origin, and the current page.
+
+        WebDriver's delete_all_cookies() and localStorage.clear() only reach
+        the current origin, so Chrome's DevTools protocol is used instead.
+        """
+        driver = self.driver
+        if driver is None:
+            return
+        self._remember_origins()
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in self._origins:
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        except WebDriverException:
+            # No DevTools access: clear what the current origin allows
+            driver.delete_all_cookies()
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except WebDriverException:
+                pass  # Storage is not accessible on some pages (e.g. about:blank, data: URLs)
+        self._origins.clear()
+        driver.get("about:blank")
+
+    def get_page_source(self, url):
+        """Load url in a clean browser state and return the rendered HTML.
+
+        A page that is only slow keeps the browser: loading is stopped after
+        page_load_timeout and whatever has rendered is returned. Any other
+        WebDriverException (crashed tab, dead session) restarts the browser
+        and the page is tried once more.
+        """
+        for attempt in range(2):
+            try:
+                driver = self.start()
+                self.reset()
+                try:
+                    driver.get(url)
+                except TimeoutException:
+                    print(f"Page load timed out after {self.page_load_timeout}s, using what has rendered: {url}")
+                    driver.execute_script("window.stop();")
+                return driver.page_source
+            except WebDriverException as e:
+                if attempt == 1:
+                    raise
+                print(f"Browser session failed ({e.__class__.__name__}), restarting Chrome")
+                self.restart()
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass  # Browser already gone
+            self.driver = None
+            self._origins.clear()
+
+    def __enter__(self):
+        # Chrome is started lazily by the first get_page_source() call
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.quit()
+
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_manager():
+    """Return the process-wide DriverManager; Chrome is quit at exit."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = DriverManager()
+            atexit.register(_shared_manager.quit)
+    return _shared_manager
@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+import time
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+# How long a resolved chromedriver path is trusted before checking for updates
+DEFAULT_TTL = 24 * 60 * 60  # One day
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "url-img-extract", "chromedriver.json")
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as file:
+            entry = json.load(file)
+        if os.path.exists(entry["path"]):
+            return entry
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_cache(cache_file, path):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as file:
+            json.dump({"path": path, "resolved_at": time.time()}, file)
+    except OSError as e:
+        print(f"Could not write chromedriver cache {cache_file}: {e}")
+
+
+def resolve_driver_path(ttl=DEFAULT_TTL, cache_file=CACHE_FILE):
+    """Return the chromedriver path, resolving it at most once per process.
+
+    Order of lookup:
+    1. the CHROMEDRIVER_PATH environment variable,
+    2. the on-disk cache, if younger than ttl seconds,
+    3. ChromeDriverManager().install() (network version lookup),
+    4. a stale cache entry, when the lookup fails (e.g. offline workers).
+    """
+    global _resolved_path
+    with _resolve_lock:
+        if _resolved_path is not None:
+            return _resolved_path
+
+        env_path = os.environ.get("CHROMEDRIVER_PATH")
+        if env_path:
+            _resolved_path = env_path
+            return _resolved_path
+
+        entry = _read_cache(cache_file)
+        if entry and time.time() - entry.get("resolved_at", 0) < ttl:
+            _resolved_path = entry["path"]
+            return _resolved_path
+
+        try:
+            path = ChromeDriverManager().install()
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"Chromedriver lookup failed ({e}), using cached {entry['path']}")
+            _resolved_path = entry["path"]
+            return _resolved_path
+
+        _write_cache(cache_file, path)
+        _resolved_path = path
+        return _resolved_path
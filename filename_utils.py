@@ -0,0 +1,31 @@
+import os
+import re
+from urllib.parse import parse_qs, urlsplit
+
+
+def sanitize_filename(img_url):
+    """Sanitize the filename by extracting it from the URL query string."""
+
+    # Check if the URL has a query string with 'f='
+    parsed_url = urlsplit(img_url)
+    query_params = parse_qs(parsed_url.query)
+
+    # If there's a query parameter 'f', use it to extract the filename
+    if 'f' in query_params:
+        filename = query_params['f'][0]  # Get the filename from the 'f' parameter
+    else:
+        # Fallback to the base name from the URL path if 'f' is not present
+        filename = os.path.basename(parsed_url.path)
+
+    # Print to check the filename before sanitization
+    print(f"Base filename before sanitization: {filename}")
+
+    # Remove '%20' (space encoding) completely
+    filename = filename.replace('%20', '')  # Remove '%20' (spaces)
+
+    # Optionally, sanitize any other unwanted characters (e.g., invalid filesystem characters)
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+
+    print(f"Sanitized filename after removing invalid characters: {filename}")
+
+    return filename
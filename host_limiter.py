@@ -0,0 +1,146 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+DEFAULT_INITIAL_LIMIT = 4  # Transfers in flight per host before any feedback
+DEFAULT_MAX_LIMIT = 64
+MAX_RETRY_AFTER = 300  # Never pause a host for longer than this many seconds
+THROTTLE_STATUSES = (429, 503)
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.peak = 0
+        self.base_latency = None  # Fastest response seen, the "uncongested" latency
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+
+
+class HostLimiter:
+    """Per-host concurrency limits tuned by AIMD (additive increase, multiplicative decrease).
+
+    Every healthy response (latency within latency_factor of the fastest one
+    seen for that host) adds 1/limit, so the limit grows by about one per
+    round of requests. A 429/503, a timeout or a reset connection multiplies
+    it by decrease, at most once per cooldown so a burst of failures counts
+    as one signal. Retry-After pauses the host for the requested time.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_LIMIT, min_limit=1, max_limit=DEFAULT_MAX_LIMIT,
+                 latency_factor=2.0, decrease=0.5, cooldown=1.0):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial)
+        return state
+
+    def _try_take(self, state):
+        if state.blocked_until > time.time() or state.in_flight >= int(state.limit):
+            return False
+        state.in_flight += 1
+        state.peak = max(state.peak, state.in_flight)
+        return True
+
+    def try_acquire(self, url):
+        """Take a slot on the URL's host if one is free right now; never blocks.
+
+        Every successful call must be paired with release(url).
+        """
+        with self._lock:
+            return self._try_take(self._state(host_of(url)))
+
+    def release(self, url):
+        with self._lock:
+            self._state(host_of(url)).in_flight -= 1
+
+    def ready_in(self, url):
+        """Seconds until the URL's host is no longer paused by Retry-After (0 if it is not)."""
+        with self._lock:
+            return max(0.0, self._state(host_of(url)).blocked_until - time.time())
+
+    def record_success(self, url, latency):
+        with self._lock:
+            state = self._state(host_of(url))
+            state.successes += 1
+            if state.base_latency is None or latency < state.base_latency:
+                state.base_latency = latency
+            if latency <= state.base_latency * self.latency_factor:
+                state.limit = min(self.max_limit, state.limit + 1.0 / state.limit)
+
+    def record_throttle(self, url, retry_after=None):
+        with self._lock:
+            state = self._state(host_of(url))
+            state.throttled += 1
+            now = time.time()
+            if now - state.last_decrease >= self.cooldown:
+                state.limit = max(self.min_limit, state.limit * self.decrease)
+                state.last_decrease = now
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+    def record_response(self, url, response, latency):
+        """Feed one response (status and time to headers) back into the host's limit."""
+        if response.status_code in THROTTLE_STATUSES:
+            self.record_throttle(url, parse_retry_after(response.headers.get("Retry-After")))
+        elif response.status_code < 500:
+            self.record_success(url, latency)
+
+    def record_error(self, url, error):
+        """Timeouts and reset connections mean the host is overloaded."""
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            self.record_throttle(url)
+
+    def stats(self):
+        """Return {host: {"limit", "peak_in_flight", "successes", "throttled"}}."""
+        with self._lock:
+            return {
+                host: {
+                    "limit": int(state.limit),
+                    "peak_in_flight": state.peak,
+                    "successes": state.successes,
+                    "throttled": state.throttled,
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+def print_host_stats(stats):
+    for host, host_stats in sorted(stats.items()):
+        print(
+            f"[{host}] limit {host_stats['limit']}, peak {host_stats['peak_in_flight']} in flight, "
+            f"{host_stats['successes']} ok, {host_stats['throttled']} throttled"
+        )
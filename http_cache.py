@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import requests
+
+from http_session import get_session
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # Bodies kept on disk before LRU eviction
+
+
+class HttpCache:
+    """On-disk HTTP cache that revalidates with ETag / Last-Modified.
+
+    Responses carrying a validator are kept under <root>/bodies. The next
+    request for the same URL is sent with If-None-Match / If-Modified-Since
+    and a 304 is answered from disk. Least recently used bodies are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, root="http_cache", max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bodies_dir = os.path.join(root, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "headers TEXT, body_path TEXT, size INTEGER, last_access REAL)"
+            )
+
+    def _body_path(self, url):
+        return os.path.join(self.bodies_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body_path FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row and os.path.exists(row[3]):
+            return row
+        return None
+
+    def _store(self, url, response):
+        body_path = self._body_path(url)
+        # A temp file per writer: threads fetching the same URL must not share one
+        fd, temp_path = tempfile.mkstemp(dir=self.bodies_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(response.content)
+            os.replace(temp_path, body_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, headers, body_path, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    json.dumps(dict(response.headers)),
+                    body_path,
+                    len(response.content),
+                    time.time(),
+                ),
+            )
+        self._evict()
+
+    def _evict(self):
+        with self._lock, self._db:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute("SELECT url, body_path, size FROM entries ORDER BY last_access").fetchall()
+            for url, body_path, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                if os.path.exists(body_path):
+                    os.remove(body_path)
+                total -= size
+
+    def _from_cache(self, url, row, revalidated):
+        """Build a 200 response from the stored body."""
+        etag, last_modified, headers, body_path = row
+        with open(body_path, "rb") as file:
+            body = file.read()
+        cached_headers = json.loads(headers)
+        # A 304 may carry fresher validators
+        cached_headers.update({key: value for key, value in revalidated.headers.items() if key in ("ETag", "Last-Modified", "Date")})
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = requests.structures.CaseInsensitiveDict(cached_headers)
+        response._content = body
+        response._content_consumed = True  # iter_content() replays the cached bytes
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE entries SET last_access = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), revalidated.headers.get("ETag"), revalidated.headers.get("Last-Modified"), url),
+            )
+        return response
+
+    def get(self, url, headers=None, **kwargs):
+        """GET url through the cache. The body is always read in full."""
+        kwargs.pop("stream", None)
+        headers = dict(headers or {})
+        row = self._lookup(url)
+        if row is not None:
+            etag, last_modified = row[0], row[1]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = get_session().get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and row is not None:
+            with self._lock:
+                self.hits += 1
+            return self._from_cache(url, row, response)
+
+        with self._lock:
+            self.misses += 1
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        has_validator = "ETag" in response.headers or "Last-Modified" in response.headers
+        if response.status_code == 200 and has_validator and "no-store" not in cache_control:
+            self._store(url, response)
+        return response
+
+
+_cache = None
+
+
+def enable_cache(root="http_cache", max_bytes=DEFAULT_MAX_BYTES):
+    """Route every cached_get() call through an on-disk cache at root."""
+    global _cache
+    _cache = HttpCache(root, max_bytes)
+    return _cache
+
+
+def cached_get(url, **kwargs):
+    """session.get() that uses the cache when enable_cache() has been called."""
+    if _cache is None:
+        return get_session().get(url, **kwargs)
+    return _cache.get(url, **kwargs)
@@ -0,0 +1,143 @@
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Browser-like User-Agent shared by every request made through the session
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Default pool settings (can be changed with configure_session)
+DEFAULT_POOL_CONNECTIONS = 10  # Number of host pools kept alive
+DEFAULT_POOL_MAXSIZE = 10  # Connections kept per host
+DEFAULT_DNS_TTL = 300  # Seconds a resolved address is reused
+DNS_CACHE_MAX_ENTRIES = 4096  # Oldest answers are dropped beyond this
+
+_session = None
+_session_lock = threading.Lock()
+_settings = {
+    "pool_connections": DEFAULT_POOL_CONNECTIONS,
+    "pool_maxsize": DEFAULT_POOL_MAXSIZE,
+    "host_pool_sizes": {},
+    "dns_ttl": DEFAULT_DNS_TTL,
+}
+
+# DNS cache: (host, port, family, type, proto, flags) -> (expires_at, result)
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """Drop-in replacement for socket.getaddrinfo that remembers answers."""
+    ttl = _settings["dns_ttl"]
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+    result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    with _dns_lock:
+        if len(_dns_cache) >= DNS_CACHE_MAX_ENTRIES:
+            # Prune expired answers, then the oldest ones if a crawl still has too many hosts
+            for stale in [cached for cached, (expires_at, _) in _dns_cache.items() if expires_at <= now]:
+                del _dns_cache[stale]
+            while len(_dns_cache) >= DNS_CACHE_MAX_ENTRIES:
+                del _dns_cache[next(iter(_dns_cache))]
+        _dns_cache.pop(key, None)  # Re-insert so dict order stays oldest first
+        _dns_cache[key] = (now + ttl, result)
+    return result
+
+
+def clear_dns_cache():
+    """Forget every cached DNS answer."""
+    with _dns_lock:
+        _dns_cache.clear()
+
+
+def configure_session(pool_connections=None, pool_maxsize=None, host_pool_sizes=None, dns_ttl=None):
+    """Change the pool settings. The shared session is rebuilt on next use.
+
+    host_pool_sizes maps a host name (e.g. "cdn.example.com") to the number
+    of keep-alive connections kept open to that host.
+    """
+    global _session
+    with _session_lock:
+        if pool_connections is not None:
+            _settings["pool_connections"] = pool_connections
+        if pool_maxsize is not None:
+            _settings["pool_maxsize"] = pool_maxsize
+        if host_pool_sizes is not None:
+            _settings["host_pool_sizes"] = dict(host_pool_sizes)
+        if dns_ttl is not None:
+            _settings["dns_ttl"] = dns_ttl
+            clear_dns_cache()
+            if dns_ttl <= 0:
+                socket.getaddrinfo = _original_getaddrinfo
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def ensure_pool_size(pool_maxsize):
+    """Grow the per-host connection pool to at least pool_maxsize.
+
+    Callers that run more parallel transfers per host than the pool holds
+    would otherwise have urllib3 discard connections and open new ones.
+    """
+    if _settings["pool_maxsize"] < pool_maxsize:
+        configure_session(pool_maxsize=pool_maxsize)
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Connection": "keep-alive",
+    })
+
+    # Default adapter used for every host without its own pool size
+    default_adapter = HTTPAdapter(
+        pool_connections=_settings["pool_connections"],
+        pool_maxsize=_settings["pool_maxsize"],
+        pool_block=False,
+    )
+    session.mount("http://", default_adapter)
+    session.mount("https://", default_adapter)
+
+    # Dedicated adapters for hosts that need a bigger (or smaller) pool
+    for host, size in _settings["host_pool_sizes"].items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=False)
+        session.mount(f"http://{host}", adapter)
+        session.mount(f"https://{host}", adapter)
+
+    # Resolve each host once per TTL instead of once per connection; a TTL of 0 restores the resolver
+    socket.getaddrinfo = _cached_getaddrinfo if _settings["dns_ttl"] > 0 else _original_getaddrinfo
+
+    return session
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use.
+
+    The session is shared by all threads; urllib3's connection pools are
+    thread-safe, so connections to the same host are reused across workers.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session():
+    """Close every pooled connection."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,110 @@
+import struct
+
+from http_session import get_session
+from retry_policy import DEFAULT_TIMEOUT
+
+# Bytes requested on the first probe, and the most we read before giving up
+PROBE_BYTES = 4 * 1024
+MAX_PROBE_BYTES = 64 * 1024  # Large EXIF blocks can push the JPEG SOF back
+
+# JPEG start-of-frame markers (everything in C0-CF except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data):
+    index = 2  # Skip the FFD8 start-of-image marker
+    while index + 9 <= len(data):
+        if data[index] != 0xFF:
+            return None  # Not on a marker boundary: corrupt or not a JPEG
+        marker = data[index + 1]
+        if marker == 0xFF:  # Fill byte
+            index += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            index += 2  # Markers without a length field
+            continue
+        segment_length = struct.unpack(">H", data[index + 2:index + 4])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[index + 5:index + 9])
+            return width, height
+        index += 2 + segment_length
+    return None
+
+
+def _webp_size(data):
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        b0, b1, b2, b3 = data[21:25]
+        width = 1 + (((b1 & 0x3F) << 8) | b0)
+        height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        return width, height
+    if chunk == b"VP8X":
+        width = 1 + int.from_bytes(data[24:27], "little")
+        height = 1 + int.from_bytes(data[27:30], "little")
+        return width, height
+    return None
+
+
+def parse_image_header(data):
+    """Return (format, width, height) from the first bytes of an image.
+
+    Formats are lower-case PIL names: jpeg, png, gif, webp. Returns None
+    when the header is unknown or the bytes end before the dimensions.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24 and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        width, height = struct.unpack("<HH", data[6:10])
+        return "gif", width, height
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        size = _webp_size(data)
+        return ("webp",) + size if size else None
+
+    if data[:2] == b"\xff\xd8":
+        size = _jpeg_size(data)
+        return ("jpeg",) + size if size else None
+
+    return None
+
+
+def _read_prefix(url, limit, timeout=DEFAULT_TIMEOUT):
+    """Fetch at most `limit` bytes of `url` and close the connection early."""
+    headers = {"Range": f"bytes=0-{limit - 1}"}
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        data = b""
+        # Servers that ignore Range send the whole body; stop reading anyway
+        for chunk in response.iter_content(chunk_size=limit):
+            data += chunk
+            if len(data) >= limit:
+                break
+    return data[:limit]
+
+
+def probe_image(url, probe_bytes=PROBE_BYTES, max_probe_bytes=MAX_PROBE_BYTES, timeout=DEFAULT_TIMEOUT):
+    """Return (format, width, height) of a remote image without downloading it.
+
+    Only the first few KB are read. The window is grown up to
+    max_probe_bytes for JPEGs whose frame header sits behind metadata.
+    Returns None when the header is inconclusive. timeout is the
+    (connect, read) pair passed to every request, so a hung socket cannot
+    keep a validation thread alive.
+    """
+    limit = probe_bytes
+    while True:
+        data = _read_prefix(url, limit, timeout)
+        info = parse_image_header(data)
+        if info is not None:
+            return info
+        # Grow the window only when the file was cut short, not when it is unknown
+        if data[:2] != b"\xff\xd8" or len(data) < limit or limit >= max_probe_bytes:
+            return None
+        limit = min(limit * 4, max_probe_bytes)
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Defaults for validating the <img> candidates of one page
+DEFAULT_MAX_WORKERS = 16  # Validations in flight per page
+DEFAULT_PAGE_TIME_BUDGET = 60  # Seconds before the remaining candidates are dropped
+
+
+def dedupe(urls):
+    """Remove duplicates while keeping the first occurrence of each URL."""
+    return list(dict.fromkeys(urls))
+
+
+def validate_concurrently(candidates, is_valid, max_workers=DEFAULT_MAX_WORKERS,
+                          time_budget=DEFAULT_PAGE_TIME_BUDGET):
+    """Run is_valid(url) over the candidates with a bounded thread pool.
+
+    Returns the valid URLs in their original page order, without duplicates.
+    Candidates still unchecked when the time budget runs out count as
+    invalid, so one slow host cannot stall the whole page. Checks already
+    running cannot be stopped, so is_valid should put a timeout on its
+    requests; otherwise a hung socket also holds up interpreter exit.
+    """
+    candidates = dedupe(candidates)
+    if not candidates:
+        return []
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(candidates)))
+    try:
+        futures = [executor.submit(is_valid, url) for url in candidates]
+        done, not_done = wait(futures, timeout=time_budget)
+    finally:
+        # Do not wait for stragglers; queued checks are cancelled outright
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not_done:
+        elapsed = time.monotonic() - started
+        print(f"Time budget reached after {elapsed:.1f}s, skipped {len(not_done)} of {len(candidates)} images")
+
+    valid_urls = []
+    for url, future in zip(candidates, futures):
+        if future in done and future.exception() is None and future.result():
+            valid_urls.append(url)
+    return valid_urls
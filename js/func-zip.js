@@ -1,6 +1,38 @@
+// Start a new images-000N.zip once the current one would pass this size
+const MAX_ZIP_BYTES = 500 * 1024 * 1024;
+
+function saveZip(zip, fileName) {
+    return zip.generateAsync({ type: "blob" })
+        .then(function (content) {
+            let link = document.createElement('a');
+            link.href = URL.createObjectURL(content);
+            link.download = fileName;
+            link.click();
+        });
+}
+
+function partName(partNumber) {
+    return "images-" + String(partNumber).padStart(4, '0') + ".zip";
+}
+
 document.getElementById('download-btn').addEventListener('click', function () {
     let zip = new JSZip();
     let folder = zip.folder("images");
+    let zipBytes = 0;
+    let partNumber = 1;
+    let saving = Promise.resolve();
+
+    // Hand the full ZIP to the saver and keep filling a fresh one
+    function flushPart() {
+        let fullZip = zip;
+        let fileName = partName(partNumber++);
+        zip = new JSZip();
+        folder = zip.folder("images");
+        zipBytes = 0;
+        saving = saving.then(function () {
+            return saveZip(fullZip, fileName);
+        });
+    }
 
     let promises = [];
     document.querySelectorAll('.image-checkbox:checked').forEach(function (checkbox) {
@@ -16,7 +48,11 @@ document.getElementById('download-btn').addEventListener('click', function () {
                 return response.blob();
             })
             .then(blob => {
+                if (zipBytes > 0 && zipBytes + blob.size > MAX_ZIP_BYTES) {
+                    flushPart();
+                }
                 folder.file(imgName, blob);
+                zipBytes += blob.size;
             })
             .catch(error => {
                 console.error('Error fetching image:', error);
@@ -25,17 +61,18 @@ document.getElementById('download-btn').addEventListener('click', function () {
         promises.push(promise);
     });
 
-    // Once all images are fetched and added, generate zip and trigger download
+    // Once all images are fetched and added, generate the last zip and trigger download
     Promise.all(promises).then(function () {
-        zip.generateAsync({ type: "blob" })
-            .then(function (content) {
-                let link = document.createElement('a');
-                link.href = URL.createObjectURL(content);
-                link.download = "images.zip";
-                link.click();
-            })
-            .catch(function (error) {
-                console.error('Error generating zip:', error);
+        if (partNumber === 1) {
+            // Everything fit in one archive: keep the usual name
+            saving = saving.then(function () {
+                return saveZip(zip, "images.zip");
             });
+        } else if (zipBytes > 0) {
+            flushPart();
+        }
+        return saving;
+    }).catch(function (error) {
+        console.error('Error generating zip:', error);
     });
-});
\ No newline at end of file
+});
@@ -1,14 +1,14 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_driver_path
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from responsive_images import harvest_image_urls
 
 def extract_image_urls_selenium(url):
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
     try:
@@ -19,12 +19,8 @@ def extract_image_urls_selenium(url):
         soup = BeautifulSoup(driver.page_source, 'html.parser')
         driver.quit()
 
-        # Find all img tags with src attributes
-        image_urls = set()
-        for img in soup.find_all('img', src=True):
-            # Resolve relative URLs
-            full_url = urljoin(url, img['src'])
-            image_urls.add(full_url)
+        # Every <img> (including lazy-load data-src/data-srcset) and inline background image
+        image_urls = set(harvest_image_urls(soup, url))
 
         return image_urls
 
@@ -2,15 +2,16 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_driver_path
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+from responsive_images import harvest_image_urls
 
 def extract_image_urls_from_page(url, domain):
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
     try:
@@ -20,12 +21,9 @@ def extract_image_urls_from_page(url, domain):
         
         soup = BeautifulSoup(driver.page_source, 'html.parser')
         
-        # Extract image URLs
-        image_elements = soup.find_all('img', src=True)
-        
+        # Extract image URLs, including lazy-load attributes and inline background images
         image_urls = set()
-        for img in image_elements:
-            full_url = urljoin(url, img['src'])
+        for full_url in harvest_image_urls(soup, url):
             # Check if the URL belongs to the specified domain
             if urlparse(full_url).netloc.endswith(domain):
                 image_urls.add(full_url)
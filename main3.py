@@ -1,7 +1,7 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_driver_path
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 
@@ -9,7 +9,7 @@ def extract_href_from_page(url, domain):
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
     try:
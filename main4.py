@@ -1,10 +1,15 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_driver_path
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
-import requests
+from http_session import get_session
+from image_probe import probe_image
+from retry_policy import DEFAULT_TIMEOUT
+from image_validation import validate_concurrently
+from responsive_images import harvest_image_urls
+from profiling import profile_stage  # Set URL_IMG_PROFILE=deterministic or sample to profile stages
 from PIL import Image
 from io import BytesIO
 
@@ -13,7 +18,7 @@ def extract_href_from_page(url, domain):
     chrome_options.add_argument("--headless")  # Run in headless mode
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
     urls = set()
@@ -37,9 +42,19 @@ def extract_href_from_page(url, domain):
     
     return urls
 
-def is_valid_image(url):
+ACCEPTED_TYPES = ("image/jpeg", "image/jpg", "image/png")  # The formats is_valid_image keeps
+
+@profile_stage("is_valid_image")
+def is_valid_image(url, probe=True):
     try:
-        response = requests.get(url, stream=True)
+        if probe:
+            # Read only the image header; fall back to a full download if it is inconclusive
+            info = probe_image(url)
+            if info is not None:
+                file_format, width, height = info
+                return file_format in ['jpeg', 'jpg', 'png'] and width > 900 and height > 900
+
+        response = get_session().get(url, stream=True, timeout=DEFAULT_TIMEOUT)  # A hung socket must not outlive the page's time budget
         response.raise_for_status()  # Check for request errors
         
         img = Image.open(BytesIO(response.content))
@@ -55,33 +70,34 @@ def is_valid_image(url):
     
     return False
 
-def extract_image_urls_from_page(url):
+@profile_stage("extract_image_urls_from_page")
+def extract_image_urls_from_page(url, max_workers=16, time_budget=60):
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
-    image_urls = set()
+    candidates = []
     try:
         driver.get(url)
         driver.implicitly_wait(10)
         
         soup = BeautifulSoup(driver.page_source, 'html.parser')
         
-        for img_tag in soup.find_all('img', src=True):
-            src = img_tag['src']
-            full_url = urljoin(url, src)  # Resolve relative URLs
-            if is_valid_image(full_url):
-                image_urls.add(full_url)
-        
-        print(f"Extracted {len(image_urls)} valid image URLs from {url}")
+        # One candidate per image (the widest of its src, srcset, <picture> and
+        # lazy-load variants), then inline background images
+        candidates = harvest_image_urls(soup, url, ACCEPTED_TYPES)
     except Exception as e:
         print(f"An error occurred while processing {url}: {e}")
     finally:
         driver.quit()
     
+    # Check the candidates in parallel; the result keeps page order
+    image_urls = validate_concurrently(candidates, is_valid_image, max_workers, time_budget)
+    print(f"Extracted {len(image_urls)} valid image URLs from {url}")
+    
     return image_urls
 
 def output_to_html(urls, output_file, max_images):
@@ -1,29 +1,31 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
-import requests
+from http_session import get_session
+from static_extractor import fetch_page_soup, path_summary
+from http_cache import enable_cache
+from crawl_state import CrawlState
+from crawler import Crawler
+from metrics import enable_export, timed
+from profiling import profile_stage  # Set URL_IMG_PROFILE=deterministic or sample to profile stages
+from image_probe import probe_image
+from retry_policy import DEFAULT_TIMEOUT
+from image_validation import validate_concurrently
+from responsive_images import harvest_image_urls
+from browser_pool import render_pages_concurrently, print_worker_stats
+from batch_image_zipper import process_images
+from streaming_pipeline import run_streaming_pipeline
 from PIL import Image
 from io import BytesIO
 
-def extract_href_from_page(url, domain):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
+EXTERNAL_LINK_SELECTOR = "a.link.link--external[href]"  # The only links followed to image pages
+
+def extract_href_from_page(url, domain, driver_manager=None, static_first=True):
     urls = set()
     try:
-        driver.get(url)
-        driver.implicitly_wait(10)
+        # Plain HTTP first, headless Chrome only if the page needs rendering
+        soup, path = fetch_page_soup(url, EXTERNAL_LINK_SELECTOR, driver_manager, static_first)
         
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        for a_tag in soup.find_all('a', class_='link link--external', href=True):
+        for a_tag in soup.select(EXTERNAL_LINK_SELECTOR):
             href = a_tag['href']
             full_url = urljoin(url, href)  # Resolve relative URLs
             if urlparse(full_url).netloc.endswith(domain):
@@ -32,14 +34,23 @@ def extract_href_from_page(url, domain):
         print(f"Extracted {len(urls)} URLs from {url}")
     except Exception as e:
         print(f"An error occurred while processing {url}: {e}")
-    finally:
-        driver.quit()
     
     return urls
 
-def is_valid_image(url):
+ACCEPTED_TYPES = ("image/jpeg", "image/jpg", "image/png")  # The formats is_valid_image keeps
+
+@timed("validate")
+@profile_stage("is_valid_image")
+def is_valid_image(url, probe=True):
     try:
-        response = requests.get(url, stream=True)
+        if probe:
+            # Read only the image header; fall back to a full download if it is inconclusive
+            info = probe_image(url)
+            if info is not None:
+                file_format, width, height = info
+                return file_format in ['jpeg', 'jpg', 'png'] and width > 900 and height > 900
+
+        response = get_session().get(url, stream=True, timeout=DEFAULT_TIMEOUT)  # A hung socket must not outlive the page's time budget
         response.raise_for_status()  # Check for request errors
         
         img = Image.open(BytesIO(response.content))
@@ -55,32 +66,34 @@ def is_valid_image(url):
     
     return False
 
-def extract_image_urls_from_page(url):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    image_urls = set()
+def extract_image_candidates(url, driver_manager=None, static_first=True, raise_errors=False, soup=None):
+    """Return every <img> URL on the page, unvalidated, in page order.
+
+    Pass soup when the page has already been fetched (e.g. by the crawler).
+    """
+    candidates = []
     try:
-        driver.get(url)
-        driver.implicitly_wait(10)
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        if soup is None:
+            # Plain HTTP first, headless Chrome only if the page needs rendering
+            soup, path = fetch_page_soup(url, 'img', driver_manager, static_first)
         
-        for img_tag in soup.find_all('img', src=True):
-            src = img_tag['src']
-            full_url = urljoin(url, src)  # Resolve relative URLs
-            if is_valid_image(full_url):
-                image_urls.add(full_url)
-        
-        print(f"Extracted {len(image_urls)} valid image URLs from {url}")
+        # One candidate per image (the widest of its src, srcset, <picture> and
+        # lazy-load variants), then inline background images
+        candidates = harvest_image_urls(soup, url, ACCEPTED_TYPES)
     except Exception as e:
         print(f"An error occurred while processing {url}: {e}")
-    finally:
-        driver.quit()
+        if raise_errors:
+            raise
+    
+    return candidates
+
+@profile_stage("extract_image_urls_from_page")
+def extract_image_urls_from_page(url, max_workers=16, time_budget=60, driver_manager=None, static_first=True, raise_errors=False, soup=None):
+    candidates = extract_image_candidates(url, driver_manager, static_first, raise_errors, soup)
+    
+    # Check the candidates in parallel; the result keeps page order
+    image_urls = validate_concurrently(candidates, is_valid_image, max_workers, time_budget)
+    print(f"Extracted {len(image_urls)} valid image URLs from {url}")
     
     return image_urls
 
@@ -150,45 +163,149 @@ def extract_urls_from_html(html_file):
     print(f"Extracted {len(urls)} URLs from {html_file}")
     return urls
 
+def discover_page_urls(website_url, domain_filter, max_images):
+    """Return the linked pages to crawl (only the first max_images are followed)."""
+    extracted_urls = extract_href_from_page(website_url, domain_filter)
+    return [url for url in extracted_urls if urlparse(url).scheme][:max_images]  # Skip URLs without a scheme
+
+def crawl_site(website_url, domain_filter, max_depth, max_pages, workers=4, strategy="bfs", links_output=None, images_output=None):
+    """Crawl max_depth levels of links from website_url and return (page_urls, image_urls).
+
+    Each page is fetched once: its links feed the frontier and its images
+    are validated from the same soup.
+    """
+    crawler = Crawler(
+        website_url, domain_filter or None, max_depth, max_pages, strategy=strategy, workers=workers,
+        extract=lambda url, soup: extract_image_urls_from_page(url, soup=soup),
+        required_selector="a[href], img",  # Hub pages with only links stay on the static path too
+    )
+    results = crawler.crawl()
+    page_urls = list(results)
+    all_image_urls = set()
+    for image_urls in results.values():
+        all_image_urls.update(image_urls)
+    print(f"Pages parsed from static HTML vs. rendered: {path_summary()}")
+
+    if links_output:
+        output_to_html(page_urls, links_output, max_pages)
+    if images_output:
+        output_to_html(all_image_urls, images_output, max_pages)
+        print(f"Combined extraction complete. Output written to {images_output}")
+
+    return page_urls, all_image_urls
+
+def extract_with_checkpoint(state):
+    """Wrap extract_image_urls_from_page so each page's outcome is saved in state.
+
+    The page must already be claimed (state.claim_next() marks it in_progress).
+    """
+    def extract(url, driver_manager=None):
+        try:
+            image_urls = extract_image_urls_from_page(url, driver_manager=driver_manager, raise_errors=True)
+        except Exception as e:
+            state.mark_failed(url, e)
+            raise
+        state.mark_done(url, image_urls)
+        return image_urls
+    return extract
+
+def run_pipeline(website_url, domain_filter, max_images, browser_workers=4, links_output=None, images_output=None, state_path=None):
+    """Crawl website_url in memory and return (page_urls, image_urls).
+
+    Each stage hands its URLs straight to the next one. links_output and
+    images_output optionally name HTML gallery files to write on the way.
+    With state_path, progress is checkpointed to SQLite and a re-run of the
+    same crawl picks up the pages that were not finished. Browser workers
+    then claim pages atomically, so several processes can share one state
+    file without processing a page twice (a resuming process still
+    requeues pages left in_progress, so start the others after it).
+    """
+    state = CrawlState(state_path) if state_path else None
+
+    # Stage 1: find the linked pages (skipped when resuming a checkpointed crawl)
+    if state is not None and state.get_meta("seed") == website_url:
+        requeued = state.recover()
+        page_urls = state.pending_urls()
+        print(f"Resuming crawl of {website_url}: {state.counts()} ({requeued} pages requeued)")
+    else:
+        page_urls = discover_page_urls(website_url, domain_filter, max_images)
+        if state is not None:
+            state.add_pages(page_urls)
+            state.set_meta("seed", website_url)
+    if links_output:
+        output_to_html(page_urls, links_output, max_images)
+        print(f"Initial extraction complete. Output written to {links_output}")
+
+    # Stage 2: extract valid image URLs from each linked page
+    all_image_urls = set()
+    if state is None:
+        worker_stats = render_pages_concurrently(page_urls, extract_image_urls_from_page, all_image_urls, browser_workers)
+    else:
+        worker_stats = render_pages_concurrently(
+            page_urls, extract_with_checkpoint(state), all_image_urls, browser_workers, claim_next=state.claim_next
+        )
+    print_worker_stats(worker_stats)
+    print(f"Pages parsed from static HTML vs. rendered: {path_summary()}")
+
+    if state is not None:
+        all_image_urls |= state.image_urls()  # Include pages finished by earlier runs
+        print(f"Crawl state: {state.counts()}")
+
+    if images_output:
+        output_to_html(all_image_urls, images_output, max_images)
+        print(f"Combined extraction complete. Output written to {images_output}")
+
+    return page_urls, all_image_urls
+
 def main():
     website_url = ""  # Change this to the target website
     domain_filter = ""  # Domain to filter
     increase_scale = 0  # Add image count
+    browser_workers = 4  # Headless browsers rendering linked pages in parallel (capped by free RAM)
+    streaming = False  # Validate, download and zip images while pages are still being crawled
+    http_cache_dir = None  # e.g. "http_cache": statically parsed pages are revalidated, not re-fetched
+    crawl_state_file = None  # e.g. "crawl_state.sqlite3" to resume the crawl after a crash
+    crawl_depth = 1  # 2-4 follows every same-site link level by level (crawler.py) instead of one hop
+    max_pages = 200  # Page budget when crawl_depth > 1
+    crawl_strategy = "bfs"  # "bfs" or "priority" (gallery-looking URLs first)
+    metrics_file = "metrics.json"  # Per-stage timings, bytes and per-host errors, written at exit
+    metrics_port = None  # e.g. 9108 to serve Prometheus text at /metrics during the run
     
-    # Initial extraction
-    extracted_urls = extract_href_from_page(website_url, domain_filter)
-    
-    # Output the initial URLs to an HTML file
-    output_file = "images.html"
-    output_to_html(extracted_urls, output_file, increase_scale)  # Set max_images to 2 for initial output
+    if crawl_state_file and (streaming or crawl_depth > 1):
+        raise ValueError("crawl_state_file only works with crawl_depth = 1 and streaming = False")
 
-    print(f"Initial extraction complete. Output written to {output_file}")
+    enable_export(metrics_file, metrics_port)
+    if http_cache_dir:
+        enable_cache(http_cache_dir)
 
-    # Read URLs from the HTML file and extract valid image data from each URL
-    urls_from_html = extract_urls_from_html(output_file)
-    
-    all_image_urls = set()
-    for url in urls_from_html:
-        if not urlparse(url).scheme:  # Skip URLs without a scheme
-            continue
-        print(f"Processing URL: {url}")
-        image_urls = extract_image_urls_from_page(url)
-        all_image_urls.update(image_urls)
-        print(f"Found {len(image_urls)} valid image URLs from {url}")
+    if streaming:
+        # Overlapping stages: the first images land in images.zip within seconds
+        page_urls = discover_page_urls(website_url, domain_filter, increase_scale)
+        run_streaming_pipeline(page_urls, extract_image_candidates, is_valid_image, "images.zip", page_workers=browser_workers)
+        print(f"{website_url}. DONE !!!")
+        return
 
-    # Output the combined extracted image URLs to a new HTML file
-    final_output_file = "combined_images.html"
-    output_to_html(all_image_urls, final_output_file, increase_scale)  # Set max_images to 2 for final output
+    # Galleries are optional outputs; set to None to skip writing them
+    if crawl_depth > 1:
+        page_urls, all_image_urls = crawl_site(
+            website_url, domain_filter, crawl_depth, max_pages, browser_workers, crawl_strategy,
+            links_output="images.html", images_output="combined_images.html",
+        )
+    else:
+        page_urls, all_image_urls = run_pipeline(
+            website_url, domain_filter, increase_scale, browser_workers,
+            links_output="images.html", images_output="combined_images.html",
+            state_path=crawl_state_file,
+        )
 
-    print(f"Combined extraction complete. Output written to {final_output_file}")
     print(f"{website_url}. DONE !!!")
 
     # Ask the user for confirmation
     user_input = input("Do you want to execute this command? (y/n): ").strip().lower()
 
     if user_input == "y":
-        # Execute the batch_image_zipper.py script
-        os.system("python batch_image_zipper.py")
+        # Zip the images straight from memory instead of re-reading combined_images.html
+        process_images(img_urls=sorted(all_image_urls), stream_to_zip=True)
     else:
         print("Command not executed.")
 
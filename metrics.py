@@ -0,0 +1,203 @@
+import atexit
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches everything
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (what Prometheus would estimate)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+
+class Metrics:
+    """In-process counters and latency histograms, keyed by name and labels.
+
+    Recording is a dict update under a lock, so it is always on; export
+    (a JSON summary, Prometheus text) is only done when asked for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timed(self, stage):
+        """Time a block (or, as a decorator, a call) as one run of stage; an exception counts as a failure."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_failures_total", stage=stage)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def summary(self):
+        """Return every counter and histogram, plus per-stage and per-host rollups, as plain data."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (histogram.count, histogram.sum, histogram.quantile(0.5), histogram.quantile(0.99))
+                          for key, histogram in self._histograms.items()}
+
+        stages = {}
+        for (name, labels), (count, total, p50, p99) in histograms.items():
+            if name == "stage_seconds":
+                stages[dict(labels)["stage"]] = {"count": count, "seconds": round(total, 3), "p50_s": p50, "p99_s": p99}
+        for (name, labels), value in counters.items():
+            labels = dict(labels)
+            if name == "stage_failures_total":
+                stages.setdefault(labels["stage"], {})["failures"] = value
+            elif name in ("bytes_in_total", "bytes_out_total"):
+                stages.setdefault(labels["stage"], {})[name[:-len("_total")]] = value
+
+        hosts = {}
+        for (name, labels), value in counters.items():
+            if name in ("host_requests_total", "host_errors_total"):
+                hosts.setdefault(dict(labels)["host"], {"requests": 0, "errors": 0})[name.split("_")[1]] = value
+        for host_stats in hosts.values():
+            host_stats["error_rate"] = round(host_stats["errors"] / host_stats["requests"], 4) if host_stats["requests"] else 0.0
+
+        return {
+            "run_seconds": round(time.time() - self.started, 3),
+            "stages": stages,
+            "hosts": hosts,
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters.items())],
+        }
+
+    def prometheus_text(self):
+        """Render everything in the Prometheus text exposition format."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = []
+        typed = set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE url_img_{name} counter")
+                lines.append(f"url_img_{name}{label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE url_img_{name} histogram")
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"url_img_{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+                lines.append(f"url_img_{name}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"url_img_{name}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def timed(stage):
+    return metrics.timed(stage)
+
+
+def fail(stage):
+    """Count a failure that the caller handled itself (e.g. a download that returned False)."""
+    metrics.inc("stage_failures_total", stage=stage)
+
+
+def add_bytes(stage, bytes_in=0, bytes_out=0):
+    if bytes_in:
+        metrics.inc("bytes_in_total", bytes_in, stage=stage)
+    if bytes_out:
+        metrics.inc("bytes_out_total", bytes_out, stage=stage)
+
+
+def record_request(url, failed=False):
+    """Count one request to url's host, and whether it failed."""
+    host = urlsplit(url).netloc.lower()
+    metrics.inc("host_requests_total", host=host)
+    if failed:
+        metrics.inc("host_errors_total", host=host)
+
+
+def write_summary(path="metrics.json"):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(metrics.summary(), file, indent=2)
+    print(f"Metrics written to {path}")
+
+
+def serve_prometheus(port=9108, host="127.0.0.1"):
+    """Serve /metrics in Prometheus text format from a background thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            found = self.path.split("?")[0] == "/metrics"
+            body = metrics.prometheus_text().encode("utf-8") if found else b"not found\n"
+            self.send_response(200 if found else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def enable_export(json_path="metrics.json", prometheus_port=None):
+    """Write the JSON summary at exit and, with a port, serve Prometheus text during the run."""
+    if json_path:
+        atexit.register(write_summary, json_path)
+    if prometheus_port:
+        return serve_prometheus(prometheus_port)
+    return None
@@ -0,0 +1,165 @@
+import os
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED, ZIP64_LIMIT
+
+from archive_utils import compress_type_for
+
+DEFAULT_LEVEL = 6  # zlib level, same as ZipFile's default for ZIP_DEFLATED
+# Private ZipFile internals _write_precompressed relies on (checked per archive)
+_ZIPFILE_INTERNALS = ("fp", "start_dir", "_lock", "_writecheck", "_didModify")
+
+
+def _compress_entry(job):
+    """Worker: read one file, checksum it and deflate it if requested."""
+    arcname, path, compress_type, level = job
+    with open(path, "rb") as file:
+        data = file.read()
+    crc = zlib.crc32(data)
+    date_time = time.localtime(os.path.getmtime(path))[:6]
+    if compress_type == ZIP_DEFLATED:
+        # Raw deflate stream (negative wbits), exactly what ZIP stores
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return arcname, date_time, len(data), crc, ZIP_DEFLATED, compressed
+    return arcname, date_time, len(data), crc, ZIP_STORED, data
+
+
+def _supports_precompressed(zipf):
+    return all(hasattr(zipf, name) for name in _ZIPFILE_INTERNALS) and hasattr(ZipInfo, "FileHeader")
+
+
+def _write_precompressed(zipf, entry):
+    """Append an already-compressed entry to zipf.
+
+    ZipFile has no public API for this, so the local header is written the
+    same way ZipFile._open_to_write does it. The central directory (with
+    ZIP64 records when needed) is still written by ZipFile.close(). If a
+    Python version lacks the internals this needs, the entry is inflated
+    again and added with writestr() instead.
+    """
+    arcname, date_time, file_size, crc, compress_type, data = entry
+    if not _supports_precompressed(zipf):
+        zinfo = ZipInfo(arcname, date_time=date_time)
+        zinfo.external_attr = 0o644 << 16
+        if compress_type == ZIP_DEFLATED:
+            data = zlib.decompress(data, -15)
+        zipf.writestr(zinfo, data, compress_type=compress_type)
+        return
+
+    zinfo = ZipInfo(arcname, date_time=date_time)
+    zinfo.compress_type = compress_type
+    zinfo.external_attr = 0o644 << 16  # Regular file, rw-r--r--
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(data)
+    zinfo.CRC = crc
+    zinfo.flag_bits = 0x00
+    zip64 = file_size > ZIP64_LIMIT or len(data) > ZIP64_LIMIT
+
+    with zipf._lock:
+        zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader(zip64))
+        zipf.fp.write(data)
+        zipf.start_dir = zipf.fp.tell()
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+
+
+def build_zip_parallel(files, zip_file_name="images.zip", workers=None, level=DEFAULT_LEVEL, deflate_everything=False):
+    """Zip (arcname, path) pairs, compressing entries on a process pool.
+
+    Compression runs in up to `workers` processes; this process is the only
+    writer and adds entries in input order, so the archive layout is
+    deterministic. The output is a standard ZIP64-capable archive.
+    Returns the number of entries written.
+    """
+    jobs = [
+        (arcname, path, compress_type_for(arcname, "", deflate_everything), level)
+        for arcname, path in files
+    ]
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4  # Entries compressed ahead of the writer (bounds memory)
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor, ZipFile(zip_file_name, "w", allowZip64=True) as zipf:
+        pending = deque()
+        job_iter = iter(jobs)
+        for job in job_iter:
+            pending.append(executor.submit(_compress_entry, job))
+            if len(pending) >= window:
+                break
+        while pending:
+            _write_precompressed(zipf, pending.popleft().result())
+            written += 1
+            job = next(job_iter, None)
+            if job is not None:
+                pending.append(executor.submit(_compress_entry, job))
+    return written
+
+
+def build_zip_sequential(files, zip_file_name="images.zip", deflate_everything=False):
+    """The current single-threaded path, kept for benchmarking."""
+    with ZipFile(zip_file_name, "w", allowZip64=True) as zipf:
+        for arcname, path in files:
+            zipf.write(path, arcname, compress_type=compress_type_for(arcname, "", deflate_everything))
+    return len(files)
+
+
+def check_round_trip(files, zip_file_name):
+    """Raise AssertionError unless zip_file_name passes testzip() and holds exactly files' bytes."""
+    with ZipFile(zip_file_name) as zipf:
+        bad_entry = zipf.testzip()
+        assert bad_entry is None, f"CRC mismatch in {bad_entry}"
+        assert zipf.namelist() == [arcname for arcname, _ in files], "entries missing or out of order"
+        for arcname, path in files:
+            with open(path, "rb") as file:
+                assert zipf.read(arcname) == file.read(), f"{arcname} differs from {path}"
+
+
+def benchmark(files, workers=None, deflate_everything=False):
+    """Time the sequential and parallel builders on the same files."""
+    results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for label, build in (("sequential", build_zip_sequential), ("parallel", build_zip_parallel)):
+            zip_path = os.path.join(out_dir, f"{label}.zip")
+            started = time.perf_counter()
+            if label == "parallel":
+                build(files, zip_path, workers=workers, deflate_everything=deflate_everything)
+            else:
+                build(files, zip_path, deflate_everything=deflate_everything)
+            elapsed = time.perf_counter() - started
+            results[label] = {"seconds": elapsed, "bytes": os.path.getsize(zip_path)}
+            print(f"{label:>10}: {elapsed:.2f}s, {results[label]['bytes'] / 1e6:.1f} MB")
+    print(f"Speed-up: {results['sequential']['seconds'] / results['parallel']['seconds']:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    # Synthetic batch of compressible images (BMP-like noise over flat colour)
+    file_count = 32
+    file_size = 4 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = []
+        for index in range(file_count):
+            path = os.path.join(work_dir, f"image_{index + 1}.bmp")
+            with open(path, "wb") as file:
+                block = os.urandom(4096) + bytes(12288)
+                file.write(block * (file_size // len(block)))
+            files.append((os.path.basename(path), path))
+        # Stored and deflated entries must read back byte for byte before timing anything
+        with open(os.path.join(work_dir, "photo.jpg"), "wb") as file:
+            file.write(os.urandom(256 * 1024))
+        check_files = files[:3] + [("photo.jpg", os.path.join(work_dir, "photo.jpg"))]
+        check_zip = os.path.join(work_dir, "round-trip.zip")
+        build_zip_parallel(check_files, check_zip, workers=2)
+        check_round_trip(check_files, check_zip)
+        print("Round-trip check passed (testzip and byte comparison)")
+        print(f"Benchmarking {file_count} x {file_size // (1024 * 1024)} MB files on {os.cpu_count()} CPUs")
+        benchmark(files)
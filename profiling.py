@@ -0,0 +1,138 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# URL_IMG_PROFILE=deterministic|sample turns profiling on; unset or "off" leaves functions untouched
+PROFILE_MODE = os.environ.get("URL_IMG_PROFILE", "off").lower()
+PROFILE_DIR = os.environ.get("URL_IMG_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.environ.get("URL_IMG_PROFILE_INTERVAL_MS", "5")) / 1000
+
+_lock = threading.Lock()
+_folded = {}  # stage -> Counter of "stage;frame;frame" -> microseconds (deterministic) or samples
+_active = {}  # thread id -> (stage, wrapper frame) of the outermost profiled call on that thread
+_local = threading.local()
+_sampler = None
+
+
+def _label(code):
+    # ';' separates frames in folded output
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _record(stage, stacks):
+    with _lock:
+        _folded.setdefault(stage, Counter()).update(stacks)
+
+
+def _run_deterministic(stage, func, args, kwargs):
+    """Trace every call and C call on this thread with sys.setprofile, keeping exact stacks."""
+    stacks = Counter()
+    stack = [stage]
+    last = [time.perf_counter()]
+
+    def tracer(frame, event, arg):
+        now = time.perf_counter()
+        stacks[";".join(stack)] += int((now - last[0]) * 1e6)  # Self time of the current stack
+        if event == "call":
+            stack.append(_label(frame.f_code))
+        elif event == "c_call":
+            stack.append(f"{getattr(arg, '__qualname__', arg)} (builtin)".replace(";", ","))
+        elif event in ("return", "c_return", "c_exception") and len(stack) > 1:
+            stack.pop()
+        last[0] = time.perf_counter()  # Leave the tracer's own time out
+
+    previous = sys.getprofile()
+    sys.setprofile(tracer)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sys.setprofile(previous)
+        _record(stage, {key: value for key, value in stacks.items() if value})
+
+
+def _sample_forever():
+    """Every SAMPLE_INTERVAL, take the stack of each thread inside a profiled stage."""
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        with _lock:
+            active = dict(_active)
+        if not active:
+            continue
+        frames = sys._current_frames()
+        samples = {}
+        for thread_id, (stage, wrapper_frame) in active.items():
+            frame = frames.get(thread_id)
+            labels = []
+            while frame is not None and frame is not wrapper_frame:
+                labels.append(_label(frame.f_code))
+                frame = frame.f_back
+            if frame is None:
+                continue  # The stage returned between the two snapshots
+            key = ";".join([stage] + labels[::-1])
+            samples.setdefault(stage, Counter())[key] += 1
+        for stage, stacks in samples.items():
+            _record(stage, stacks)
+
+
+def _run_sampled(stage, func, args, kwargs):
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_forever, name="profile-sampler", daemon=True)
+            _sampler.start()
+        _active[threading.get_ident()] = (stage, sys._getframe())
+    try:
+        return func(*args, **kwargs)
+    finally:
+        with _lock:
+            _active.pop(threading.get_ident(), None)
+
+
+def profile_stage(stage):
+    """Decorator: profile every call of the function as part of stage.
+
+    With URL_IMG_PROFILE unset the function is returned unchanged. A call
+    made from inside another profiled call on the same thread stays in the
+    outer stage's profile.
+    """
+    def decorator(func):
+        if PROFILE_MODE not in ("deterministic", "sample"):
+            return func
+        run = _run_deterministic if PROFILE_MODE == "deterministic" else _run_sampled
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "stage", None) is not None:
+                return func(*args, **kwargs)
+            _local.stage = stage
+            try:
+                return run(stage, func, args, kwargs)
+            finally:
+                _local.stage = None
+        return wrapper
+    return decorator
+
+
+def write_profiles(directory=None):
+    """Write one <stage>.folded file per stage (input for flamegraph.pl or speedscope)."""
+    with _lock:
+        folded = {stage: Counter(stacks) for stage, stacks in _folded.items()}
+    if not folded:
+        return None
+    directory = directory or os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    os.makedirs(directory, exist_ok=True)
+    for stage, stacks in folded.items():
+        with open(os.path.join(directory, f"{stage}.folded"), "w", encoding="utf-8") as file:
+            for stack, value in stacks.most_common():
+                file.write(f"{stack} {value}\n")
+    unit = "microseconds" if PROFILE_MODE == "deterministic" else "samples"
+    print(f"Profiles ({PROFILE_MODE}, {unit}) for {', '.join(sorted(folded))} written to {directory}")
+    return directory
+
+
+if PROFILE_MODE in ("deterministic", "sample"):
+    atexit.register(write_profiles)
@@ -0,0 +1,209 @@
+import mimetypes
+import re
+from urllib.parse import urljoin, urlsplit
+
+ASSUMED_VIEWPORT = 1920  # Pixels, to turn "vw" lengths in sizes into widths
+
+# Where lazy loaders keep the real URL until JavaScript swaps it in
+LAZY_SRC_ATTRIBUTES = ("data-src", "data-original", "data-lazy", "data-lazy-src", "data-echo")
+LAZY_SRCSET_ATTRIBUTES = ("data-srcset", "data-lazy-srcset")
+BACKGROUND_ATTRIBUTES = ("data-bg", "data-background", "data-background-image")
+# Distinct background images that make a page a tile gallery rather than a page with a hero banner
+MIN_BACKGROUND_GALLERY_IMAGES = 4
+_CSS_URL = re.compile(r"url\(\s*(['\"]?)(.*?)\1\s*\)", re.IGNORECASE)
+
+
+def _descriptor(text):
+    """Return ("w", width), ("x", density) or None for a srcset descriptor."""
+    for token in text.split():
+        try:
+            if token.endswith("w"):
+                return "w", int(token[:-1])
+            if token.endswith("x"):
+                return "x", float(token[:-1])
+        except ValueError:
+            continue  # e.g. a height descriptor we do not use
+    return None
+
+
+def parse_srcset(value):
+    """Split a srcset attribute into (url, descriptor) pairs.
+
+    Follows the HTML parsing rules, so URLs containing commas (common on
+    image CDNs) survive: a URL runs to the next whitespace and its
+    descriptors run to the next comma outside parentheses.
+    """
+    candidates = []
+    position, length = 0, len(value or "")
+    while position < length:
+        while position < length and (value[position].isspace() or value[position] == ","):
+            position += 1
+        start = position
+        while position < length and not value[position].isspace():
+            position += 1
+        url = value[start:position]
+        descriptor_text = ""
+        if url.endswith(","):
+            url = url.rstrip(",")
+        else:
+            start, depth = position, 0
+            while position < length and not (value[position] == "," and depth == 0):
+                if value[position] == "(":
+                    depth += 1
+                elif value[position] == ")":
+                    depth = max(0, depth - 1)
+                position += 1
+            descriptor_text = value[start:position]
+            position += 1
+        if url:
+            candidates.append((url, _descriptor(descriptor_text)))
+    return candidates
+
+
+def parse_sizes(value):
+    """Largest slot width in a sizes attribute, in pixels, or None."""
+    widths = []
+    for entry in (value or "").split(","):
+        length = entry.strip().split(" ")[-1] if entry.strip() else ""
+        try:
+            if length.endswith("px"):
+                widths.append(float(length[:-2]))
+            elif length.endswith("vw"):
+                widths.append(float(length[:-2]) * ASSUMED_VIEWPORT / 100)
+        except ValueError:
+            continue  # calc() and friends
+    return max(widths) if widths else None
+
+
+def _number(value):
+    try:
+        return float(str(value).strip().rstrip("px"))
+    except (TypeError, ValueError):
+        return None
+
+
+def image_variants(img_tag, base_url):
+    """Every variant of one image: the <img> src/srcset plus its <picture> <source>s.
+
+    Lazy-load attributes (data-src, data-srcset, ...) count as variants
+    too, and win ties against src, which then usually holds a placeholder.
+
+    Returns (url, estimated_width, density, content_type) tuples. Width is
+    the w descriptor, or density times the layout width (sizes, else the
+    width attribute) when that is known.
+    """
+    elements = []
+    parent = img_tag.parent
+    if parent is not None and parent.name == "picture":
+        elements.extend(parent.find_all("source", recursive=False))
+    elements.append(img_tag)
+
+    width_attribute = _number(img_tag.get("width"))
+    variants = []
+
+    def add(url, descriptor, content_type, layout_width):
+        url = url.strip()
+        if not url or url.startswith("data:"):
+            return  # Inline placeholders are never the real image
+        url = urljoin(base_url, url)
+        content_type = content_type or mimetypes.guess_type(urlsplit(url).path)[0]
+        kind, amount = descriptor or ("x", 1.0)
+        if kind == "w":
+            variants.append((url, amount, None, content_type))
+        else:
+            variants.append((url, amount * layout_width if layout_width else None, amount, content_type))
+
+    for element in elements:
+        content_type = element.get("type") if element.name == "source" else None
+        layout_width = parse_sizes(element.get("sizes") or element.get("data-sizes")) or width_attribute
+        for attribute in LAZY_SRCSET_ATTRIBUTES + ("srcset",):
+            for url, descriptor in parse_srcset(element.get(attribute, "")):
+                add(url, descriptor, content_type, layout_width)
+    for attribute in LAZY_SRC_ATTRIBUTES + ("src",):
+        if img_tag.get(attribute):
+            add(img_tag[attribute], None, None, width_attribute)
+    return variants
+
+
+def best_image_url(img_tag, base_url, accept_types=None):
+    """Pick the widest variant of an <img> from the markup alone, or None.
+
+    With accept_types (e.g. ("image/jpeg", "image/png")) variants of other
+    known types are passed over, unless nothing else is left.
+    """
+    variants = image_variants(img_tag, base_url)
+    if accept_types:
+        accepted = [variant for variant in variants if variant[3] is None or variant[3] in accept_types]
+        variants = accepted or variants
+    if not variants:
+        return None
+    # Known widths beat unknown ones; between equal widths the higher density wins
+    best = max(variants, key=lambda variant: (variant[1] or 0, variant[2] or 0))
+    return best[0]
+
+
+def _css_urls(value):
+    return [match.group(2) for match in _CSS_URL.finditer(value or "")]
+
+
+def background_image_urls(soup, base_url):
+    """URLs from inline background(-image) styles and data-bg style attributes, in page order."""
+    urls = []
+    for element in soup.find_all(True):
+        style = element.get("style", "")
+        found = _css_urls(style) if "background" in style.lower() else []
+        for attribute in BACKGROUND_ATTRIBUTES:
+            value = element.get(attribute)
+            if value:
+                found.extend(_css_urls(value) or [value])
+        for url in found:
+            url = url.strip()
+            if url and not url.startswith("data:"):
+                urls.append(urljoin(base_url, url))
+    return urls
+
+
+def _is_lazy(img_tag):
+    if any(img_tag.get(attribute) for attribute in LAZY_SRC_ATTRIBUTES + LAZY_SRCSET_ATTRIBUTES):
+        return True
+    parent = img_tag.parent
+    return parent is not None and parent.name == "picture" and any(
+        source.get(attribute) for source in parent.find_all("source", recursive=False) for attribute in LAZY_SRCSET_ATTRIBUTES
+    )
+
+
+def _unique(urls):
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def harvest_image_urls(soup, base_url, accept_types=None):
+    """One URL per <img> (best_image_url) followed by inline background images, without duplicates."""
+    urls = [best_image_url(img_tag, base_url, accept_types) for img_tag in soup.find_all("img")]
+    for url in background_image_urls(soup, base_url):
+        content_type = mimetypes.guess_type(urlsplit(url).path)[0]
+        if not accept_types or content_type is None or content_type in accept_types:
+            urls.append(url)
+    return _unique(urls)
+
+
+def lazy_image_urls(soup, base_url):
+    """Only the URLs that lazy loaders hide: lazy <img> attributes and background images."""
+    urls = [best_image_url(img_tag, base_url) for img_tag in soup.find_all("img") if _is_lazy(img_tag)]
+    return _unique(urls + background_image_urls(soup, base_url))
+
+
+def has_lazy_images(soup, min_background_images=MIN_BACKGROUND_GALLERY_IMAGES):
+    """True when the markup already names the images a lazy loader would show.
+
+    That is any lazy <img>/<source> attribute, or at least
+    min_background_images distinct background images (data-bg tiles,
+    inline background-image styles). One site header with a background
+    image is not enough to keep a JavaScript-built gallery from rendering.
+    """
+    if any(
+        element.get(attribute)
+        for element in soup.find_all(("img", "source"))
+        for attribute in LAZY_SRC_ATTRIBUTES + LAZY_SRCSET_ATTRIBUTES
+    ):
+        return True
+    return len(set(background_image_urls(soup, ""))) >= min_background_images
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+
+
+def part_path_for(download_folder, img_name, img_url):
+    """Path of the .part file for img_url; the URL hash keeps it unique per URL."""
+    url_key = hashlib.sha1(img_url.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(download_folder, f"{img_name}.{url_key}.part")
+
+
+def _meta_path(part_path):
+    return part_path + ".json"
+
+
+def resume_headers(part_path):
+    """Return (offset, headers) to continue an interrupted transfer.
+
+    The Range request carries If-Range with the validator saved when the
+    transfer started, so a changed file is sent in full instead.
+    """
+    if not os.path.exists(part_path):
+        return 0, {}
+    offset = os.path.getsize(part_path)
+    validator = None
+    try:
+        with open(_meta_path(part_path), "r", encoding="utf-8") as file:
+            validator = json.load(file).get("validator")
+    except (OSError, ValueError):
+        pass
+    if not offset or not validator:
+        return 0, {}  # Without a validator the bytes on disk cannot be trusted
+    return offset, {"Range": f"bytes={offset}-", "If-Range": validator}
+
+
+def start_offset(response, requested_offset):
+    """Where the response body starts: the requested offset for a matching 206, else 0."""
+    if requested_offset and response.status_code == 206:
+        content_range = response.headers.get("Content-Range", "")
+        if content_range.startswith(f"bytes {requested_offset}-"):
+            return requested_offset
+    return 0
+
+
+def save_validator(part_path, response):
+    """Remember the strong ETag (or Last-Modified) used to resume this transfer."""
+    etag = response.headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+    with open(_meta_path(part_path), "w", encoding="utf-8") as file:
+        json.dump({"validator": validator, "url": response.url}, file)
+
+
+def is_complete(part_path, response, offset):
+    """True unless Content-Length says bytes are still missing."""
+    content_length = response.headers.get("Content-Length")
+    if content_length is None or "gzip" in response.headers.get("Content-Encoding", ""):
+        return True  # Nothing to compare against
+    return os.path.getsize(part_path) >= offset + int(content_length)
+
+
+def finish_part(part_path, final_path):
+    """Atomically move a finished .part file to its final name."""
+    os.replace(part_path, final_path)
+    discard_part(part_path)
+
+
+def discard_part(part_path):
+    for path in (part_path, _meta_path(part_path)):
+        if os.path.exists(path):
+            os.remove(path)
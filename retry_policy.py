@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+
+import requests
+
+from host_limiter import host_of, parse_retry_after
+from http_session import get_session
+from metrics import record_request
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds; read is the longest gap between bytes
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Fail fast on hosts that keep failing.
+
+    After failure_threshold consecutive failures a host's circuit opens and
+    requests to it fail immediately. Once reset_timeout has passed a single
+    probe request is let through: success closes the circuit, failure opens
+    it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}  # host -> {"failures", "opened_at", "probing"}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        return self._hosts.setdefault(host, {"failures": 0, "opened_at": None, "probing": False})
+
+    def allow(self, host):
+        with self._lock:
+            state = self._state(host)
+            if state["opened_at"] is None:
+                return True
+            if state["probing"] or time.time() - state["opened_at"] < self.reset_timeout:
+                return False
+            state["probing"] = True  # Half-open: this caller is the probe
+            return True
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts[host] = {"failures": 0, "opened_at": None, "probing": False}
+
+    def record_failure(self, host):
+        with self._lock:
+            state = self._state(host)
+            state["failures"] += 1
+            if state["probing"] or state["failures"] >= self.failure_threshold:
+                if state["opened_at"] is None or state["probing"]:
+                    print(f"Circuit open for {host} after {state['failures']} failures")
+                state["opened_at"] = time.time()
+                state["probing"] = False
+
+    def open_hosts(self):
+        with self._lock:
+            return sorted(host for host, state in self._hosts.items() if state["opened_at"] is not None)
+
+
+class RetryBudget:
+    """Cap retries at a fraction of all requests so an outage cannot multiply the load.
+
+    Every request deposits ratio tokens and every retry spends one; the
+    bucket starts with min_retries tokens and never holds more than max_tokens.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10, max_tokens=100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_retries)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Send GET requests with timeouts, jittered exponential backoff and a circuit breaker.
+
+    Connection errors, timeouts and the statuses in RETRY_STATUSES are
+    retried up to max_attempts in total, while the shared RetryBudget
+    allows it. Backoff is "full jitter": a random delay up to
+    backoff_base * 2**attempt (capped at backoff_max), or Retry-After if
+    the server asks for longer.
+    """
+
+    def __init__(self, max_attempts=4, backoff_base=0.5, backoff_max=30.0, timeout=DEFAULT_TIMEOUT,
+                 breaker=None, budget=None):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget or RetryBudget()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _may_retry(self, attempt):
+        return attempt + 1 < self.max_attempts and self.budget.try_spend()
+
+    def get(self, url, send=None, observer=None, **kwargs):
+        """GET url with retries. send defaults to the shared session's get.
+
+        observer (e.g. a HostLimiter) is told about every attempt through
+        record_response(url, response, latency) and record_error(url, error).
+        Returns the last response, which may still be an error status.
+        """
+        send = send or get_session().get
+        kwargs.setdefault("timeout", self.timeout)
+        host = host_of(url)
+        attempt = 0
+        while True:
+            if not self.breaker.allow(host):
+                raise CircuitOpenError(f"circuit open for {host}, not requesting {url}")
+            self.budget.record_request()
+            started = time.time()
+            try:
+                response = send(url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                record_request(url, failed=True)
+                self.breaker.record_failure(host)
+                if observer is not None:
+                    observer.record_error(url, e)
+                if not self._may_retry(attempt):
+                    raise
+                delay = self.backoff(attempt)
+                print(f"Retrying {url} in {delay:.1f}s ({e})")
+            except requests.exceptions.RequestException as e:
+                # Not retried (e.g. TooManyRedirects), but still recorded so a half-open probe is never left pending
+                record_request(url, failed=True)
+                self.breaker.record_failure(host)
+                if observer is not None:
+                    observer.record_error(url, e)
+                raise
+            else:
+                record_request(url, failed=response.status_code >= 400)
+                if observer is not None:
+                    observer.record_response(url, response, time.time() - started)
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success(host)
+                    return response
+                if response.status_code == 429:
+                    self.breaker.record_success(host)  # Busy, not down
+                else:
+                    self.breaker.record_failure(host)
+                if not self._may_retry(attempt):
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After")) or 0
+                delay = max(self.backoff(attempt), retry_after)
+                print(f"Retrying {url} in {delay:.1f}s (HTTP {response.status_code})")
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy():
+    """Return the process-wide RetryPolicy, so breaker and budget are shared."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = RetryPolicy()
+        return _policy
@@ -0,0 +1,100 @@
+import json
+import os
+from zipfile import ZipFile
+
+DEFAULT_MAX_SHARD_BYTES = 1024 * 1024 * 1024  # 1 GiB per volume
+
+
+class ShardedZipWriter:
+    """Write images across images-0001.zip, images-0002.zip, ...
+
+    A new shard is started before an entry would push the current one past
+    max_bytes, or once it holds max_entries. Each shard is closed (and so
+    fully readable) as soon as the next one starts, and the index file that
+    maps every entry to its shard is rewritten at that point.
+
+    The open()/writestr() methods mirror ZipFile, so callers can use either.
+    """
+
+    def __init__(self, prefix="images", max_bytes=DEFAULT_MAX_SHARD_BYTES, max_entries=None, index_file=None):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.index_file = index_file or f"{prefix}-index.json"
+        self.shards = []
+        self.entries = {}  # arcname -> shard file name
+        self._zip = None
+        self._shard_entries = 0
+
+    def _shard_name(self, number):
+        return f"{self.prefix}-{number:04d}.zip"
+
+    def _shard_bytes(self):
+        return self._zip.fp.tell() if self._zip is not None else 0
+
+    def _roll_over_if_needed(self, incoming_bytes=0):
+        if self._zip is not None and self._shard_entries > 0:
+            full = self.max_entries is not None and self._shard_entries >= self.max_entries
+            too_big = self.max_bytes is not None and self._shard_bytes() + incoming_bytes > self.max_bytes
+            if full or too_big:
+                self._close_shard()
+        if self._zip is None:
+            name = self._shard_name(len(self.shards) + 1)
+            self._zip = ZipFile(name, "w", allowZip64=True)
+            self.shards.append(name)
+            self._shard_entries = 0
+
+    def _close_shard(self):
+        self._zip.close()
+        print(f"Finished shard {self.shards[-1]} ({self._shard_entries} images)")
+        self._zip = None
+        self._write_index()
+
+    def _write_index(self):
+        index = {"shards": self.shards, "entries": self.entries}
+        temp_file = f"{self.index_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump(index, file, indent=1)
+        os.replace(temp_file, self.index_file)  # Readers never see a half-written index
+
+    def _record(self, zinfo_or_arcname):
+        arcname = getattr(zinfo_or_arcname, "filename", zinfo_or_arcname)
+        self.entries[arcname] = self.shards[-1]
+        self._shard_entries += 1
+
+    def open(self, zinfo_or_arcname, mode="w", force_zip64=False):
+        """Open a new entry for streaming. A ZipInfo's file_size (e.g. the
+        spooled body's size) is used as the expected size for the roll-over check."""
+        self._roll_over_if_needed(getattr(zinfo_or_arcname, "file_size", 0))
+        self._record(zinfo_or_arcname)
+        return self._zip.open(zinfo_or_arcname, mode, force_zip64=force_zip64)
+
+    def write(self, filename, arcname=None, compress_type=None):
+        """Add a file from disk, like ZipFile.write; its size drives the roll-over check."""
+        arcname = arcname or os.path.basename(filename)
+        self._roll_over_if_needed(os.path.getsize(filename))
+        self._record(arcname)
+        self._zip.write(filename, arcname, compress_type=compress_type)
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None):
+        self._roll_over_if_needed(len(data))
+        self._record(zinfo_or_arcname)
+        self._zip.writestr(zinfo_or_arcname, data, compress_type=compress_type)
+
+    def close(self):
+        if self._zip is not None:
+            self._close_shard()
+        else:
+            self._write_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def shard_for(index_file, arcname):
+    """Look up which shard holds arcname."""
+    with open(index_file, "r", encoding="utf-8") as file:
+        return json.load(file)["entries"].get(arcname)
@@ -0,0 +1,99 @@
+import threading
+
+from bs4 import BeautifulSoup
+
+from driver_manager import get_shared_manager
+from http_cache import cached_get
+from metrics import add_bytes, record_request, timed
+from responsive_images import has_lazy_images
+
+STATIC_TIMEOUT = (5, 20)  # (connect, read) seconds for the plain HTML fetch
+
+# Markup that means the visible content is built by JavaScript
+SPA_MARKERS = (
+    'id="root"',
+    'id="app"',
+    'id="__next"',
+    "data-reactroot",
+    "ng-version",
+    "ng-app",
+    "__NUXT__",
+    "window.__INITIAL_STATE__",
+)
+NOSCRIPT_GATE_WORDS = ("enable javascript", "javascript is required", "javascript is disabled")
+
+# url -> "static" or "browser (<reason>)" for every page seen in this run
+page_paths = {}
+_paths_lock = threading.Lock()
+
+
+def needs_render(html, soup, required_selector="img"):
+    """Return why the page needs a browser, or None if the static HTML will do.
+
+    required_selector is the CSS selector the caller extracts with; the
+    static HTML is only kept when something matches it.
+    """
+    lowered = html.lower()
+    for noscript in soup.find_all("noscript"):
+        text = noscript.get_text(" ").lower()
+        if any(word in text for word in NOSCRIPT_GATE_WORDS):
+            return "<noscript> gate"
+    if soup.select_one(required_selector) is None and not (required_selector == "img" and has_lazy_images(soup)):
+        return f"nothing matches {required_selector}"
+    for marker in SPA_MARKERS:
+        if marker.lower() in lowered and len(soup.get_text(strip=True)) < 200:
+            return f"SPA marker {marker}"
+    return None
+
+
+def _record_path(url, path):
+    with _paths_lock:
+        page_paths[url] = path
+    print(f"[{path}] {url}")
+
+
+def fetch_page_soup(url, required_selector="img", driver_manager=None, static_first=True):
+    """Parse a page, fetching it with plain HTTP when possible.
+
+    The HTML is first fetched with requests. Headless Chrome is used only
+    when the fetch fails or needs_render() finds a reason to render.
+    Returns (soup, path) where path is "static" or "browser (<reason>)".
+    """
+    reason = "static path disabled"
+    if static_first:
+        try:
+            with timed("fetch"):
+                try:
+                    response = cached_get(url, timeout=STATIC_TIMEOUT)
+                except Exception:
+                    record_request(url, failed=True)
+                    raise
+                record_request(url, failed=response.status_code >= 400)
+                add_bytes("fetch", bytes_in=len(response.content))
+                response.raise_for_status()
+            if "html" not in response.headers.get("Content-Type", "html"):
+                raise ValueError("response is not HTML")
+            with timed("parse"):
+                soup = BeautifulSoup(response.text, "html.parser")
+            reason = needs_render(response.text, soup, required_selector)
+            if reason is None:
+                _record_path(url, "static")
+                return soup, "static"
+        except Exception as e:
+            reason = f"static fetch failed: {e}"
+
+    driver_manager = driver_manager or get_shared_manager()
+    with timed("render"):
+        page_source = driver_manager.get_page_source(url)
+    with timed("parse"):
+        soup = BeautifulSoup(page_source, "html.parser")
+    path = f"browser ({reason})"
+    _record_path(url, path)
+    return soup, path
+
+
+def path_summary():
+    """Return how many pages took the static path and how many needed a browser."""
+    with _paths_lock:
+        static = sum(1 for path in page_paths.values() if path == "static")
+        return {"static": static, "browser": len(page_paths) - static}
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from zipfile import ZipFile
+
+from archive_utils import entry_name, entry_info
+from driver_manager import DriverManager
+from retry_policy import get_retry_policy  # Timeouts, backoff and per-host circuit breaker
+
+# Bounded queues keep memory flat: a fast stage blocks instead of racing ahead
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_PAGE_WORKERS = 2
+DEFAULT_VALIDATE_WORKERS = 16
+DEFAULT_DOWNLOAD_WORKERS = 8
+
+_DONE = object()  # Sentinel telling a worker its input is exhausted
+
+
+def _start_stage(name, handle, inbox, outbox, workers, downstream_workers):
+    """Run handle(item) on `workers` threads; every value it yields goes to outbox.
+
+    Once all workers have drained their inbox, one sentinel per downstream
+    worker is sent so the next stage shuts down in turn.
+    """
+    def run():
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            try:
+                for result in handle(item):
+                    outbox.put(result)
+            except Exception as e:
+                print(f"[{name}] Error processing {item}: {e}")
+
+    threads = [threading.Thread(target=run, name=f"{name}-{index}", daemon=True) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    def close():
+        for thread in threads:
+            thread.join()
+        for _ in range(downstream_workers):
+            outbox.put(_DONE)
+
+    closer = threading.Thread(target=close, name=f"{name}-closer", daemon=True)
+    closer.start()
+    return closer
+
+
+def run_streaming_pipeline(page_urls, extract_candidates, is_valid, zip_file_name="images.zip",
+                           page_workers=DEFAULT_PAGE_WORKERS, validate_workers=DEFAULT_VALIDATE_WORKERS,
+                           download_workers=DEFAULT_DOWNLOAD_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """Crawl, validate, download and zip with all four stages overlapping.
+
+    extract_candidates(url, driver_manager=...) returns a page's image URLs
+    and is_valid(url) decides whether to keep one. Images are written to
+    the ZIP as soon as they are downloaded. Returns a stats dict.
+    """
+    started = time.monotonic()
+    stats = {"pages": 0, "candidates": 0, "valid": 0, "downloaded": 0, "archived": 0, "first_image_seconds": None}
+    stats_lock = threading.Lock()
+
+    page_queue = queue.Queue()
+    validate_queue = queue.Queue(maxsize=queue_size)
+    download_queue = queue.Queue(maxsize=queue_size)
+    archive_queue = queue.Queue(maxsize=queue_size)
+
+    seen = set()
+    managers = []
+    local = threading.local()
+
+    def count(key, amount=1):
+        with stats_lock:
+            stats[key] += amount
+
+    # Stage 1: render/parse pages, one DriverManager per page worker
+    def extract_stage(page_url):
+        if not hasattr(local, "driver_manager"):
+            local.driver_manager = DriverManager()
+            with stats_lock:
+                managers.append(local.driver_manager)
+        candidates = extract_candidates(page_url, driver_manager=local.driver_manager)
+        count("pages")
+        for img_url in candidates:
+            with stats_lock:
+                if img_url in seen:
+                    continue  # Already queued from another page
+                seen.add(img_url)
+                stats["candidates"] += 1
+            yield img_url
+
+    # Stage 2: size/format checks
+    def validate_stage(img_url):
+        if is_valid(img_url):
+            count("valid")
+            yield img_url
+
+    # Stage 3: fetch the image bytes (with timeouts, so a hung socket cannot stall the writer's shutdown)
+    def download_stage(img_url):
+        with get_retry_policy().get(img_url, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Failed to download: {img_url}")
+                return
+            content_type, content = response.headers.get("Content-Type", ""), response.content
+        count("downloaded")
+        yield img_url, content_type, content
+
+    for url in page_urls:
+        page_queue.put(url)
+    for _ in range(page_workers):
+        page_queue.put(_DONE)
+
+    _start_stage("extract", extract_stage, page_queue, validate_queue, page_workers, validate_workers)
+    _start_stage("validate", validate_stage, validate_queue, download_queue, validate_workers, download_workers)
+    _start_stage("download", download_stage, download_queue, archive_queue, download_workers, 1)
+
+    # Stage 4: a single writer appends each image to the ZIP as it lands
+    with ZipFile(zip_file_name, "w", allowZip64=True) as zipf:
+        while True:
+            item = archive_queue.get()
+            if item is _DONE:
+                break
+            img_url, content_type, content = item
+            stats["archived"] += 1
+            zipf.writestr(entry_info(entry_name(stats["archived"], img_url, content_type), content_type), content)
+            if stats["first_image_seconds"] is None:
+                stats["first_image_seconds"] = time.monotonic() - started
+                print(f"First image archived after {stats['first_image_seconds']:.1f}s")
+
+    for driver_manager in managers:
+        driver_manager.quit()
+
+    stats["total_seconds"] = time.monotonic() - started
+    print(f"Streamed {stats['archived']} images from {stats['pages']} pages into {zip_file_name} "
+          f"in {stats['total_seconds']:.1f}s")
+    return stats